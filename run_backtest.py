@@ -1,38 +1,30 @@
-import sys
 import re
 import argparse
 from datetime import datetime, timedelta
 from src.backtester import Backtester
 from dotenv import load_dotenv
 
+# Number + unit pairs in any order, e.g. '2y', '1y6m', '6m 1y', '18months' (unit = first letter)
+_DUR_RE = re.compile(r"(\d+)\s*([ymd])")
+_UNIT_DAYS = {'y': 365, 'm': 30, 'd': 1} # Months approx 30 days
+
 def parse_duration(duration_str):
     """
     Parses strings like '2y', '1y6m', '100d' into total days.
-    Default to days if no suffix.
+    Default to days if no suffix. Raises argparse.ArgumentTypeError if nothing parses.
     """
-    duration_str = duration_str.lower()
-    total_days = 0
-    
-    # Check for years
-    y_match = re.search(r'(\d+)y', duration_str)
-    if y_match:
-        total_days += int(y_match.group(1)) * 365
-        
-    # Check for months (approx 30 days)
-    m_match = re.search(r'(\d+)m', duration_str)
-    if m_match:
-        total_days += int(m_match.group(1)) * 30
-        
-    # Check for days
-    d_match = re.search(r'(\d+)d', duration_str)
-    if d_match:
-        total_days += int(d_match.group(1))
-        
+    duration_str = duration_str.lower().strip()
+
     # If no suffix, treat as days
-    if total_days == 0 and duration_str.isdigit():
+    if duration_str.isdigit():
         total_days = int(duration_str)
-        
-    return total_days if total_days > 0 else 365
+    else:
+        total_days = sum(int(n) * _UNIT_DAYS[unit] for n, unit in _DUR_RE.findall(duration_str))
+
+    if total_days <= 0:
+        raise argparse.ArgumentTypeError(
+            f"invalid duration '{duration_str}' (expected e.g. 2y, 1y6m, 100d)")
+    return total_days
 
 def main():
     load_dotenv()
@@ -42,6 +34,8 @@ def main():
     parser.add_argument("duration", type=str, nargs="?", default="1y", help="Duration (e.g., 2y, 1y6m, 100d)")
     parser.add_argument("-b", "--benchmark", type=str, default="QQQ", help="Benchmark Tickers, comma separated (default: QQQ)")
     parser.add_argument("-v", "--verbose", action="store_true", help="Enable verbose output")
+    parser.add_argument("--use-batch", action="store_true", help="Collect all signals up front and submit AI reviews as one concurrent batch")
+    parser.add_argument("--semantic-cache", action="store_true", help="Reuse the AI verdict of an earlier week with a similar setup (RSI, EMA distance, signal, news tone)")
     
     args = parser.parse_args()
 
@@ -49,7 +43,10 @@ def main():
     # Split benchmarks by comma and clean up
     benchmarks = [b.strip().upper() for b in args.benchmark.split(",")]
     
-    days = parse_duration(args.duration)
+    try:
+        days = parse_duration(args.duration)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
     start_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
     
     print(f"🛠️  Initializing Backtest for {ticker} over last {args.duration} ({days} days)...")
@@ -63,7 +60,9 @@ def main():
         initial_capital=10000,
         use_ai=True,
         benchmark_tickers=benchmarks,
-        verbose=args.verbose
+        verbose=args.verbose,
+        prefetch_ai=args.use_batch,
+        semantic_cache=args.semantic_cache
     )
     
     try:
@@ -1,18 +1,402 @@
 import requests
 import os
-import json
 import re
 import time
+import random
+import threading
+import textwrap
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+from .ai_cache import ResponseCache
+from . import fast_json
+
+_OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+_CHAT_COMPLETIONS_URL = f"{_OPENROUTER_BASE_URL}/chat/completions"
+# Per-request header; auth/attribution headers live on the session
+_JSON_HEADERS = {"Content-Type": "application/json"}
+_JSON_OBJECT_FORMAT = {"type": "json_object"}
+
+# US ticker symbols, optionally with a share-class suffix (e.g. BRK.B, BF-B)
+_TICKER = r"[A-Z]{1,5}(?:[.\-][A-Z]{1,2})?"
+_TICKER_RE = re.compile(rf"\b{_TICKER}\b")
+# Explicitly marked symbols: "$TSLA" or "Nvidia (NVDA)"
+_MARKED_TICKER_RE = re.compile(rf"\$({_TICKER})\b|\(\s*({_TICKER})\s*\)")
+
+_CHINESE_CODES = frozenset({'zh', 'zh_tw', 'chinese'})
+
+# Language-dependent prompt/report strings, keyed by "is the output language Chinese"
+_LANG_TEXT = {
+    True: {
+        "name": "Traditional Chinese (繁體中文)",
+        "analysis": "Respond in Traditional Chinese (繁體中文) for the **analysis** field. **CRITICAL:** Keep financial terms (e.g., EMA, RSI) in English.",
+        "alert": "Respond in Traditional Chinese (繁體中文). Keep financial terms and ticker symbols in English.",
+        "summary_title": "市場機會：",
+    },
+    False: {
+        "name": "English",
+        "analysis": "Respond in English.",
+        "alert": "Respond in English.",
+        "summary_title": "Market Opportunity:",
+    },
+}
+
+_ANALYST_SYSTEM_PROMPT = "You are a concise financial analyst outputting structured JSON."
+
+# get_analysis user prompt; {lang} is rendered once per instance, the rest is
+# filled with str.format_map per call so only the per-ticker values are interpolated.
+_ANALYSIS_TMPL = textwrap.dedent("""
+    Analyze {ticker} at ${price:.2f}. Strategy suggests: {signal} ({reason}).
+    Technical Data: EMA 20: ${ema:.2f}, RSI 14: {rsi:.1f}, Stop Loss: ${stop_loss:.2f}.
+
+    {context}
+
+    Instructions:
+    1. Language: {lang}
+    2. CITATIONS: Use **[Source Name](URL)** format for all references within the 'analysis' field.
+    """)
+
+# get_analyses user prompt; {tickers} is the per-ticker block
+_BATCH_ANALYSIS_TMPL = textwrap.dedent("""
+    Give a second opinion on each strategy signal below (20 EMA, 14 RSI, ATR stop).
+    tickers:
+    {tickers}
+
+    Use WEB SEARCH to check for any recent news or macro events affecting these stocks.
+
+    Instructions:
+    1. Language: {lang}
+    2. CITATIONS: Use **[Source Name](URL)** format for all references within the 'analysis' field.
+    3. Return JSON: {{"TICKER": {{"verdict": "Agree|Disagree|Caution", "confidence": "Low|Medium|High", "sizing": "Aggressive|Standard|Conservative", "analysis": "..."}}}}, one key per ticker, no prose.
+    """)
+
+# generate_recommendation_report user prompt
+_REPORT_TMPL = textwrap.dedent("""
+    Macro Context: {macro}
+    Verified Strategy Picks: {picks}
+
+    Task:
+    1. Write a 'market_summary' based on the macro regime.
+    2. Write a 'note' for each pick combining technicals and {news_source}.
+    3. Language: {lang}.
+    4. CITATIONS: Use **[Source Name](URL)** format for references.
+    """)
+
+# analyze_alert user prompt
+_ALERT_TMPL = "Event: {ticker} Alert triggered.\nDetails: {msg}\nPrice: ${price} ({change}%)\nNews: {news}\n\nExplain if news correlates with price."
+
+# Verdict prefixes, checked in order (first substring match wins)
+_VERDICT_EMOJI = (("Agree", "✅ "), ("Disagree", "❌ "), ("Caution", "⚠️ "))
+
+# One line of the weekly recommendation report
+_PICK_TMPL = "1. **[{ticker}]** - ${price}\n   - **Strategy:** {signal}\n   - **Analyst Note:** {note}\n\n"
+
+# Structured-output formats, built once and shared by every call
+_ANALYSIS_SCHEMA = {
+    "name": "stock_analysis",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "verdict": { "type": "string", "description": "Agree, Disagree, or Caution" },
+            "confidence": { "type": "string", "description": "Low, Medium, or High" },
+            "sizing": { "type": "string", "description": "Aggressive, Standard, or Conservative" },
+            "analysis": { "type": "string", "description": "Detailed reasoning with citations" }
+        },
+        "required": ["verdict", "confidence", "sizing", "analysis"]
+    }
+}
+
+_CANDIDATES_SCHEMA = {
+    "name": "ticker_candidates",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "candidates": {
+                "type": "array",
+                "items": { "type": "string" }
+            }
+        },
+        "required": ["candidates"]
+    }
+}
+
+_REPORT_SCHEMA = {
+    "name": "recommendation_report",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "market_summary": { "type": "string" },
+            "picks": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "ticker": { "type": "string" },
+                        "note": { "type": "string", "description": "Analyst perspective with citations" }
+                    },
+                    "required": ["ticker", "note"]
+                }
+            }
+        },
+        "required": ["market_summary", "picks"]
+    }
+}
+
+_ALERT_SCHEMA = {
+    "name": "alert_analysis",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "insight": { "type": "string", "description": "1-2 sentence explanation of the event" }
+        },
+        "required": ["insight"]
+    }
+}
+
+def _conforms(value, schema):
+    """
+    Structural check for the JSON Schema subset used above (object/array/string,
+    required keys). Providers don't all enforce strict mode, so _call_ai checks
+    responses itself and retries ones that don't fit.
+    """
+    kind = schema.get("type")
+    if kind == "object":
+        if not isinstance(value, dict):
+            return False
+        props = schema.get("properties", {})
+        return all(k in value and _conforms(value[k], props.get(k, {})) for k in schema.get("required", ()))
+    if kind == "array":
+        item_schema = schema.get("items", {})
+        return isinstance(value, list) and all(_conforms(v, item_schema) for v in value)
+    if kind == "string":
+        return isinstance(value, str)
+    return True
+
+_GROK_OPEN = "<grok:"
+_CITATION_OPEN = '<argument name="citation_id">'
+
+def _strip_grok_tags(text):
+    """
+    Rewrites <grok:render ...><argument name="citation_id">10</argument>...</grok:render>
+    to " [10] " and drops any other <grok:NAME ...>...</grok:NAME> element.
+    A single left-to-right str.find scan, so malformed markup can't trigger
+    regex backtracking; an open tag without its closing tag is left as-is.
+    """
+    out = []
+    pos = 0
+    unclosed = set() # tag names already known to have no closing tag ahead
+    while True:
+        start = text.find(_GROK_OPEN, pos)
+        if start < 0:
+            break
+        open_end = text.find(">", start)
+        if open_end < 0:
+            break
+
+        head = text[start + len(_GROK_OPEN):open_end]
+        name = head.split(None, 1)[0].rstrip("/") if head.strip() else ""
+        if head.endswith("/"):
+            # Self-closing tag carries no content
+            out.append(text[pos:start])
+            pos = open_end + 1
+            continue
+
+        close_tag = f"</grok:{name}>"
+        end = -1 if (not name or name in unclosed) else text.find(close_tag, open_end)
+        if end < 0:
+            unclosed.add(name)
+            out.append(text[pos:open_end + 1])
+            pos = open_end + 1
+            continue
+
+        out.append(text[pos:start])
+        if name == "render":
+            inner = text[open_end + 1:end]
+            cid_at = inner.find(_CITATION_OPEN)
+            if cid_at >= 0:
+                cid_end = inner.find("</argument>", cid_at)
+                cid = inner[cid_at + len(_CITATION_OPEN):cid_end].strip() if cid_end >= 0 else ""
+                if cid.isdigit():
+                    out.append(f" [{cid}] ")
+        pos = end + len(close_tag)
+
+    if not out:
+        return text
+    out.append(text[pos:])
+    return "".join(out)
+
+class RateLimiter:
+    """
+    Thread-safe token bucket that paces requests to a queries-per-minute budget.
+    """
+    def __init__(self, qpm=500):
+        self.capacity = max(1, int(qpm))
+        self.tokens = float(self.capacity)
+        self.refill_per_sec = self.capacity / 60.0
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a token is available, then consumes it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_sec)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.refill_per_sec
+            time.sleep(wait)
+
+def _clean_ticker(raw):
+    """
+    Extracts one symbol from a model-written candidate such as "NVDA", "$TSLA",
+    "Nvidia (NVDA)" or "BRK.B". Returns None if nothing looks like a ticker.
+    """
+    if not isinstance(raw, str):
+        return None
+    text = raw.strip()
+    if _TICKER_RE.fullmatch(text.upper()):
+        return text.upper()
+    # A $-prefixed or parenthesized symbol wins over the surrounding name
+    m = _MARKED_TICKER_RE.search(text.upper())
+    if m:
+        return m.group(1) or m.group(2)
+    # Otherwise the first token that is already written as a symbol ("NVDA - Nvidia");
+    # prose words are not upper-cased first, so "Nvidia Corp" does not yield "CORP"
+    for token in text.split():
+        token = token.strip(",;:()[]")
+        if _TICKER_RE.fullmatch(token):
+            return token
+    return None
+
+def _join_capped(lines, width, placeholder=" ..."):
+    """Newline-joins whole lines until the next one would pass width chars, then marks the cut."""
+    out, used = [], 0
+    for line in lines:
+        used += len(line) + (1 if out else 0)
+        if used > width:
+            return "\n".join(out) + placeholder if out else line[:width] + placeholder
+        out.append(line)
+    return "\n".join(out)
 
 class AIAnalyst:
-    def __init__(self):
+    def __init__(self, max_concurrency=None, rate_limit=None):
         self.api_key = os.getenv('OPENROUTER_API_KEY')
+        self._enabled = bool(self.api_key)
         # Default to a cost-effective but smart model, can be overridden in .env
         self.model = os.getenv('OPENROUTER_MODEL', 'google/gemini-2.0-flash-exp:free') 
         self.language = os.getenv('AI_LANGUAGE', 'en').lower() # en or zh_tw
         self.site_url = "https://github.com/yourusername/stock-sentinel"
         self.app_name = "Stock Sentinel"
 
+        # Language-dependent prompt fragments are fixed for the instance lifetime.
+        self._is_chinese = self.language in _CHINESE_CODES
+        lang_text = _LANG_TEXT[self._is_chinese]
+        self._lang_name = lang_text["name"]
+        self._analysis_lang_instr = lang_text["analysis"]
+        self._summary_title = lang_text["summary_title"]
+        self._alert_system_prompt = f"You are a concise financial news analyst. {lang_text['alert']}"
+        # Render the invariant language lines once; only per-call fields are left to fill
+        self._analysis_tmpl = _ANALYSIS_TMPL.replace("{lang}", self._analysis_lang_instr)
+        self._batch_analysis_tmpl = _BATCH_ANALYSIS_TMPL.replace("{lang}", self._analysis_lang_instr)
+        self._report_tmpl = _REPORT_TMPL.replace("{lang}", self._lang_name)
+
+        # Alerts with no news and a move smaller than this (in %) get a canned insight
+        self._alert_min_move = float(os.getenv('ALERT_LLM_MIN_MOVE_PCT', '2.0'))
+
+        # Request fields shared by every completion; _call_ai layers the per-call ones on top
+        self._base_payload = {"model": self.model, "temperature": 0.5}
+
+        # Keep concurrent fan-outs inside the account's RPM tier:
+        # the semaphore caps in-flight requests, the bucket paces QPM.
+        if max_concurrency is None:
+            max_concurrency = int(os.getenv('OPENROUTER_MAX_CONC', '10'))
+        if rate_limit is None:
+            rate_limit = int(os.getenv('OPENROUTER_QPM', '500'))
+        self.max_concurrency = max(1, max_concurrency)
+        self._sem = threading.BoundedSemaphore(self.max_concurrency)
+        self._rl = RateLimiter(qpm=rate_limit)
+
+        # The pooled session is built on first use, so runs without an API key
+        # (every method short-circuits on _enabled) never construct it.
+        self._session = None
+        self._session_lock = threading.Lock()
+
+        # cache_key -> Event for requests currently on the wire
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+
+        # Replayed backtests and re-runs send identical prompts; answer those locally.
+        self._cache = ResponseCache(os.getenv('AI_CACHE_DIR', '.ai_cache'))
+
+    def _get_session(self):
+        """
+        Returns the shared requests.Session, creating it on first use.
+        One pooled session serves every OpenRouter call so keep-alive connections
+        are reused instead of paying a fresh TCP+TLS handshake per request.
+        """
+        if self._session is not None:
+            return self._session
+
+        with self._session_lock:
+            # Another analyze_many worker may have built it while we waited
+            if self._session is not None:
+                return self._session
+
+            session = requests.Session()
+            # Pool size matches the in-flight cap, so every concurrent worker
+            # gets a kept-alive connection rather than a throwaway one.
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=self.max_concurrency,
+                # Only failed connects are retried here: the request never reached the
+                # server, so resending the POST cannot bill a completion twice. Read
+                # timeouts and 429/5xx go to _post_with_retries, which re-acquires the
+                # rate limiter and sleeps outside the in-flight semaphore.
+                max_retries=Retry(
+                    total=3,
+                    connect=3,
+                    read=0,
+                    status=0,
+                    backoff_factor=0.5,
+                    raise_on_status=False,
+                ),
+            )
+            session.mount(_OPENROUTER_BASE_URL, adapter)
+            # requests already advertises "br" (and urllib3 decodes it) whenever the
+            # brotli package is importable, so no Accept-Encoding override is needed.
+            session.headers.update({
+                "Authorization": f"Bearer {self.api_key}",
+                "HTTP-Referer": self.site_url,
+                "X-Title": self.app_name,
+            })
+            self._session = session
+            return session
+
+    def close(self):
+        """Releases the pooled OpenRouter connections."""
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def clear_cache(self):
+        """Drops the in-memory response memo; on-disk entries expire by TTL."""
+        self._cache.clear_memory()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
     def _clean_text(self, text):
         """
         Cleans up raw XML tags from Grok/OpenRouter output.
@@ -21,36 +405,74 @@ class AIAnalyst:
         """
         if not text or not isinstance(text, str): return text
         
-        # 1. Aggressive XML Cleaner
-        # Pattern A: Try to find citation_id
-        pattern_id = r'<grok:render[^>]*>.*?<argument name="citation_id">(\\d+)</argument>.*?</grok:render>'
-        text = re.sub(pattern_id, r' [\1] ', text, flags=re.DOTALL)
-        
-        # Pattern B: Cleanup any remaining grok tags that didn't match Pattern A
-        pattern_residual = r'<grok:[^>]+>.*?</grok:[^>]+>'
-        text = re.sub(pattern_residual, '', text, flags=re.DOTALL)
-        
-        # Cleanup double spaces created by replacement
-        text = re.sub(r'\s+', ' ', text).strip()
+        # 1. Aggressive XML Cleaner (only Grok emits these tags; most models never do)
+        if _GROK_OPEN in text:
+            # Citations become [N]; any other grok element is dropped
+            text = _strip_grok_tags(text)
+
+        # Cleanup double spaces created by replacement.
+        # Anything besides single ' ' separators (newlines, tabs, NBSP...) is non-printable.
+        # str.split() breaks on the same Unicode whitespace runs as \s+ and drops the ends.
+        if '  ' in text or not text.replace(' ', '').isprintable():
+            text = " ".join(text.split())
+        else:
+            text = text.strip()
         
         return text
 
-    def _call_ai(self, messages, schema=None, max_retries=2, plugins=None):
+    def _read_stream(self, response):
+        """
+        Accumulates the delta content of an OpenRouter SSE stream into one string.
+        Stops parsing as soon as the content forms a complete JSON document; the trailing
+        frames (finish/usage chunks, [DONE]) are only drained, so the kept-alive
+        connection goes back to the pool instead of being closed mid-response.
+        """
+        parts = []
+        opened = closed = 0
+        with response:
+            for line in response.iter_lines():
+                # Skip keep-alives and SSE comments (": OPENROUTER PROCESSING")
+                if not line or not line.startswith(b"data: "):
+                    continue
+                payload = line[6:]
+                if payload == b"[DONE]":
+                    break
+                chunk = fast_json.loads(payload)
+                if 'error' in chunk:
+                    raise RuntimeError(f"Stream error: {chunk['error']}")
+                choices = chunk.get('choices') or [{}]
+                delta = choices[0].get('delta', {}).get('content')
+                if delta:
+                    parts.append(delta)
+                    opened += delta.count('{')
+                    closed += delta.count('}')
+                    # Balanced braces are only a hint (strings may hold braces); confirm by parsing
+                    if closed and opened == closed:
+                        content = "".join(parts)
+                        try:
+                            fast_json.loads(content)
+                        except fast_json.JSONDecodeError:
+                            continue
+                        for _ in response.iter_lines():
+                            pass
+                        return content
+        return "".join(parts)
+
+    def _call_ai(self, messages, schema=None, max_retries=2, plugins=None, force_refresh=False, stream=False, max_tokens=1000, cache_ttl=7*86400, cache_scope=None, cache_id=None):
         """
         Unified method to call AI with retry logic and JSON schema support.
+        Successful responses are cached by prompt hash for cache_ttl seconds;
+        force_refresh bypasses the lookup. cache_scope (e.g. a date string) is mixed
+        into the key so otherwise-identical prompts are only reused within that scope.
+        cache_id replaces the messages in the key, so near-identical prompts that map
+        to the same cache_id share one answer.
+        stream=True consumes the completion as server-sent events.
         """
-        if not self.api_key:
+        if not self._enabled:
             return None
 
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "HTTP-Referer": self.site_url,
-            "X-Title": self.app_name,
-            "Content-Type": "application/json"
-        }
-
         # Prepare response format
-        response_format = {"type": "json_object"}
+        response_format = _JSON_OBJECT_FORMAT
         if schema:
             response_format = {
                 "type": "json_schema",
@@ -58,52 +480,95 @@ class AIAnalyst:
             }
 
         data = {
-            "model": self.model,
+            **self._base_payload,
             "messages": messages,
             "response_format": response_format,
-            "temperature": 0.5,
-            "max_tokens": 1000
+            "max_tokens": max_tokens
         }
 
         if plugins:
             data["plugins"] = plugins
+        if stream:
+            data["stream"] = True
+
+        cache_key = ResponseCache.make_key({
+            "model": self.model,
+            "lang": self.language,
+            "msgs": data["messages"] if cache_id is None else cache_id,
+            "temp": data["temperature"],
+            "schema": schema["name"] if schema else None,
+            "plugins": plugins,
+            "scope": cache_scope,
+        })
+        if not force_refresh:
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        # Coalesce concurrent identical requests (e.g. the same setup queued twice in
+        # one fan-out): the first caller fetches, the others wait and read its answer.
+        with self._inflight_lock:
+            pending = self._inflight.get(cache_key)
+            if pending is None:
+                self._inflight[cache_key] = threading.Event()
+        if pending is not None:
+            pending.wait()
+            # None if the leading request exhausted its retries
+            return self._cache.get(cache_key)
 
+        try:
+            return self._post_with_retries(data, schema, stream, max_retries, cache_key, cache_ttl)
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(cache_key).set()
+
+    def _post_with_retries(self, data, schema, stream, max_retries, cache_key, cache_ttl):
+        """Sends one completion request for _call_ai, retrying on errors and malformed output."""
         for attempt in range(max_retries + 1):
+            retry_after = None
             try:
-                response = requests.post(
-                    "https://openrouter.ai/api/v1/chat/completions",
-                    headers=headers,
-                    data=json.dumps(data),
-                    timeout=45
-                )
+                with self._sem:
+                    self._rl.acquire()
+                    response = self._get_session().post(
+                        _CHAT_COMPLETIONS_URL,
+                        data=fast_json.dumps(data),
+                        headers=_JSON_HEADERS,
+                        stream=stream,
+                        # Streaming: fail fast on connect, but let a healthy generation run
+                        timeout=(5, 60) if stream else 45
+                    )
+                    if response.status_code == 200:
+                        if stream:
+                            content = self._read_stream(response)
+                        else:
+                            content = fast_json.loads(response.content)['choices'][0]['message']['content']
 
                 if response.status_code == 200:
-                    result = response.json()
-                    content = result['choices'][0]['message']['content']
-                    
                     # 1. Parse JSON
-                    parsed = json.loads(content)
+                    parsed = fast_json.loads(content)
+                    if schema and not _conforms(parsed, schema["schema"]):
+                        raise TypeError(f"response does not match schema '{schema['name']}'")
                     
-                    # 2. Clean all string fields in the parsed JSON (to preserve citations and remove XML)
-                    def clean_json(obj):
-                        if isinstance(obj, dict):
-                            return {k: clean_json(v) for k, v in obj.items()}
-                        elif isinstance(obj, list):
-                            return [clean_json(v) for v in obj]
-                        elif isinstance(obj, str):
-                            return self._clean_text(obj)
-                        return obj
-                    
-                    return clean_json(parsed)
+                    # Free-text fields are run through _clean_text by the callers that render them
+                    self._cache.set(cache_key, parsed, ttl=cache_ttl)
+                    return parsed
                 
                 else:
                     print(f"⚠️ AI API Error (Attempt {attempt+1}): {response.status_code} - {response.text}")
+                    retry_after = response.headers.get('Retry-After')
             
-            except (json.JSONDecodeError, Exception) as e:
+            except (fast_json.JSONDecodeError, KeyError, IndexError, TypeError) as e:
+                # 200 OK, but the envelope or content was not the JSON we asked for
+                print(f"⚠️ AI Malformed Response (Attempt {attempt+1}): {e!r}")
+            except (requests.RequestException, RuntimeError) as e:
                 print(f"⚠️ AI Call Exception (Attempt {attempt+1}): {e}")
             
             if attempt < max_retries:
-                time.sleep(1.5 * (attempt + 1))
+                delay = 1.5 * (attempt + 1)
+                if retry_after and retry_after.isdigit():
+                    delay = max(delay, float(retry_after))
+                # Jitter keeps concurrent workers from retrying in lockstep
+                time.sleep(delay + random.random() * 0.25)
                 data["temperature"] += 0.1 # Increase entropy slightly on retry
         
         return None
@@ -112,89 +577,199 @@ class AIAnalyst:
         """
         Sends technical data to LLM for a second opinion using JSON Schema.
         """
-        signal = analysis_data['signal']
-        price = analysis_data['price']
-        
-        # Language instruction
-        lang_instruction = "Respond in English."
-        if self.language in ['zh', 'zh_tw', 'chinese']:
-            lang_instruction = "Respond in Traditional Chinese (繁體中文) for the **analysis** field. **CRITICAL:** Keep financial terms (e.g., EMA, RSI) in English."
-
-        # Define Schema
-        schema = {
-            "name": "stock_analysis",
-            "strict": True,
-            "schema": {
-                "type": "object",
-                "properties": {
-                    "verdict": { "type": "string", "description": "Agree, Disagree, or Caution" },
-                    "confidence": { "type": "string", "description": "Low, Medium, or High" },
-                    "sizing": { "type": "string", "description": "Aggressive, Standard, or Conservative" },
-                    "analysis": { "type": "string", "description": "Detailed reasoning with citations" }
-                },
-                "required": ["verdict", "confidence", "sizing", "analysis"]
-            }
-        }
+        if not self._enabled:
+            return "AI Analysis skipped (no API key)."
 
         # Context construction
         if backtest_config:
             sim_date = backtest_config.get('date')
             hist_news = backtest_config.get('news', [])
-            news_section = "\n".join(hist_news) if hist_news else "No specific news found."
-            context = f"STRICT KNOWLEDGE CUTOFF: Act as if today is {sim_date}. Knowledge of the future is FORBIDDEN.\nRecent News: {news_section}"
+            # Cap the news blob so long backtests don't inflate input tokens
+            news_section = _join_capped(hist_news, 2000) if hist_news else "No specific news found."
+            context = (
+                f"STRICT KNOWLEDGE CUTOFF: Act as if today is {sim_date}. Knowledge of the future is FORBIDDEN.\n"
+                f"Recent News: {news_section}\n"
+                "Keep the analysis field under 80 words."
+            )
+            # No web search in replay: it is the slowest part of a call and would leak the future
             plugins = None
+            max_tokens = 300
+            # A past date's context never changes, so re-runs and sweeps can reuse it indefinitely
+            cache_ttl = 365 * 86400 if sim_date and sim_date < date.today().isoformat() else 6 * 3600
         else:
             context = "Use WEB SEARCH to check for any recent news or macro events affecting this stock."
             plugins = [{"id": "web"}]
+            # Four short fields plus inline citation links
+            max_tokens = 600
+            cache_ttl = 6 * 3600
 
+        prompt = self._analysis_tmpl.format_map({
+            **analysis_data,
+            'ticker': ticker,
+            'context': context,
+        })
         messages = [
-            {"role": "system", "content": "You are a concise financial analyst outputting structured JSON."},
-            {"role": "user", "content": f"""
-                Analyze {ticker} at ${price:.2f}. Strategy suggests: {signal} ({analysis_data['reason']}).
-                Technical Data: EMA 20: ${analysis_data['ema']:.2f}, RSI 14: {analysis_data['rsi']:.1f}, Stop Loss: ${analysis_data['stop_loss']:.2f}.
-                
-                {context}
-                
-                Instructions:
-                1. Language: {lang_instruction}
-                2. CITATIONS: Use **[Source Name](URL)** format for all references within the 'analysis' field.
-                """}
+            {"role": "system", "content": _ANALYST_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
         ]
 
-        result = self._call_ai(messages, schema=schema, plugins=plugins)
+        # Live setups only wiggle by cents between re-runs, which would always miss an
+        # exact-prompt cache. Key them on a coarse fingerprint instead (price/EMA to
+        # ~1%, whole RSI points); replays keep the exact prompt as their key.
+        cache_id = None
+        if not backtest_config:
+            cache_id = (
+                f"{ticker}|{analysis_data['signal']}|price={analysis_data['price']:.3g}"
+                f"|ema={analysis_data['ema']:.3g}|rsi={analysis_data['rsi']:.0f}"
+            )
+
+        # Live lookups stream so slow generations don't trip a whole-body timeout
+        result = self._call_ai(messages, schema=_ANALYSIS_SCHEMA, plugins=plugins, stream=not backtest_config,
+                               max_tokens=max_tokens, cache_ttl=cache_ttl, cache_id=cache_id)
         
         if result:
-            v = result['verdict']
-            if 'Agree' in v: v = "✅ " + v
-            elif 'Disagree' in v: v = "❌ " + v
-            elif 'Caution' in v: v = "⚠️ " + v
-            
-            return (
-                f"**Verdict:** {v}\n"
-                f"**Confidence:** {result['confidence']}\n"
-                f"**Sizing:** {result['sizing']}\n"
-                f"**Analysis:** {result['analysis']}"
-            )
+            return self._format_verdict(result)
         return "AI Analysis failed to provide structured output."
 
+    def _format_verdict(self, result):
+        """Renders a parsed verdict/confidence/sizing/analysis dict as markdown."""
+        v = result.get('verdict', 'N/A')
+        for key, emoji in _VERDICT_EMOJI:
+            if key in v:
+                v = emoji + v
+                break
+
+        return (
+            f"**Verdict:** {v}\n"
+            f"**Confidence:** {result.get('confidence', 'N/A')}\n"
+            f"**Sizing:** {result.get('sizing', 'N/A')}\n"
+            f"**Analysis:** {self._clean_text(result.get('analysis', 'N/A'))}"
+        )
+
+    def get_analyses(self, items, batch_size=8):
+        """
+        Second opinion for several tickers, batch_size tickers per request.
+        items: List of dicts, each containing 'ticker' and 'analysis'.
+        Returns {ticker: formatted_comment}.
+        """
+        if not items:
+            return {}
+        if not self._enabled:
+            return {it['ticker']: "AI Analysis skipped (no API key)." for it in items}
+
+        # Small batches keep each completion well inside the output budget;
+        # the batches themselves are independent, so they share the pool concurrently.
+        batches = [items[i:i + batch_size] for i in range(0, len(items), max(1, batch_size))]
+        if len(batches) == 1:
+            return self._get_analyses_batch(batches[0])
+
+        comments = {}
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as ex:
+            for batch_comments in ex.map(self._get_analyses_batch, batches):
+                comments.update(batch_comments)
+        return comments
+
+    def _get_analyses_batch(self, items):
+        """One multi-ticker request for get_analyses."""
+        # The shared instructions are sent once; only the per-ticker block grows with N.
+        ticker_lines = []
+        for it in items:
+            a = it['analysis']
+            ticker_lines.append(
+                f"  - ticker: {it['ticker']}\n"
+                f"    price: {a['price']:.2f}\n"
+                f"    signal: {a['signal']}\n"
+                f"    reason: {a['reason']}\n"
+                f"    ema: {a['ema']:.2f}\n"
+                f"    rsi: {a['rsi']:.1f}\n"
+                f"    stop_loss: {a['stop_loss']:.2f}"
+            )
+        tickers_block = "\n".join(ticker_lines)
+
+        messages = [
+            {"role": "system", "content": _ANALYST_SYSTEM_PROMPT},
+            {"role": "user", "content": self._batch_analysis_tmpl.format(tickers=tickers_block)}
+        ]
+
+        # ~500 tokens per verdict, capped so a large batch can't run away
+        max_tokens = min(500 * len(items), 4000)
+        # Up to 4000 output tokens: stream so a long generation isn't cut by the 45 s body timeout
+        result = self._call_ai(messages, plugins=[{"id": "web"}], stream=True, max_tokens=max_tokens, cache_ttl=6*3600)
+
+        comments = {}
+        for it in items:
+            ticker = it['ticker']
+            entry = result.get(ticker) if isinstance(result, dict) else None
+            if isinstance(entry, dict):
+                comments[ticker] = self._format_verdict(entry)
+            else:
+                comments[ticker] = "AI Analysis failed to provide structured output."
+        return comments
+
+    def should_analyze(self, prev_data, curr_data, rsi_threshold=5.0, price_threshold=0.05):
+        """
+        Cheap gate in front of get_analysis: a fresh LLM opinion is only worth
+        paying for when the setup materially changed since the last one.
+        prev_data/curr_data: strategy analysis dicts (prev_data None on first call).
+        """
+        if prev_data is None:
+            return True
+        if prev_data['signal'] != curr_data['signal']:
+            return True
+        if abs(curr_data['rsi'] - prev_data['rsi']) > rsi_threshold:
+            return True
+        if abs(curr_data['price'] / prev_data['price'] - 1) > price_threshold:
+            return True
+        return False
+
+    def analyze_many(self, items, max_workers=None):
+        """
+        Runs get_analysis for several independent signals concurrently.
+        items: List of dicts with 'ticker', 'analysis' and optional 'backtest_config'.
+        max_workers defaults to the in-flight cap (and pool size) so no worker
+        ever waits for a free kept-alive connection.
+        Returns the AI comments in the same order as items.
+        """
+        if not items:
+            return []
+
+        # Each call is pure network wait, so threads overlap the round trips
+        # while sharing the pooled session.
+        if max_workers is None:
+            max_workers = self.max_concurrency
+        workers = max(1, min(max_workers, len(items)))
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            futures = [
+                ex.submit(self.get_analysis, it['ticker'], it['analysis'], it.get('backtest_config'))
+                for it in items
+            ]
+            return [f.result() for f in futures]
+
+    def analyze_alerts(self, items, max_workers=None):
+        """
+        Runs analyze_alert for several watchdog alerts concurrently.
+        items: List of dicts with 'ticker', 'alert' and optional 'news'.
+        Returns the AI insights in the same order as items.
+        """
+        if not items:
+            return []
+
+        if max_workers is None:
+            max_workers = self.max_concurrency
+        workers = max(1, min(max_workers, len(items)))
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            futures = [
+                ex.submit(self.analyze_alert, it['ticker'], it['alert'], it.get('news'))
+                for it in items
+            ]
+            return [f.result() for f in futures]
+
     def get_ticker_candidates(self):
         """
         Asks the AI to find potential trending tickers.
         """
-        schema = {
-            "name": "ticker_candidates",
-            "strict": True,
-            "schema": {
-                "type": "object",
-                "properties": {
-                    "candidates": {
-                        "type": "array",
-                        "items": { "type": "string" }
-                    }
-                },
-                "required": ["candidates"]
-            }
-        }
+        if not self._enabled:
+            return []
 
         messages = [
             {"role": "system", "content": "You are a financial screener."},
@@ -202,14 +777,28 @@ class AIAnalyst:
         ]
 
         print("  -> Asking AI for trending candidates...")
-        result = self._call_ai(messages, schema=schema, plugins=[{"id": "web"}])
-        return result.get('candidates', []) if result else []
+        # The prompt never changes, so scope reuse to the calendar day (re-runs of the
+        # same day's scan share one answer, the next day always asks again)
+        result = self._call_ai(messages, schema=_CANDIDATES_SCHEMA, plugins=[{"id": "web"}], max_tokens=200,
+                               cache_ttl=6*3600, cache_scope=date.today().isoformat())
+        if not result:
+            return []
+
+        # Models sometimes return "Nvidia (NVDA)" or "$TSLA"; keep only clean, unique
+        # symbols so each one costs at most one price-history fetch downstream.
+        candidates = []
+        for raw in result['candidates']:
+            ticker = _clean_ticker(raw)
+            if ticker and ticker not in candidates:
+                candidates.append(ticker)
+        return candidates
 
-    def generate_recommendation_report(self, verified_picks, macro_data=None):
+    def generate_recommendation_report(self, verified_picks, macro_data=None, mode="live"):
         """
         verified_picks: List of dicts, each containing 'ticker' and 'analysis'.
+        mode: "live" enables web search; "backtest" skips it and uses a smaller token budget.
         """
-        if not verified_picks: return None
+        if not verified_picks or not self._enabled: return None
 
         # Prepare Data
         picks_data = [{
@@ -223,96 +812,76 @@ class AIAnalyst:
         if macro_data:
             macro_text = f"Regime: {macro_data['regime']}, Reason: {macro_data['reason']}"
 
-        schema = {
-            "name": "recommendation_report",
-            "strict": True,
-            "schema": {
-                "type": "object",
-                "properties": {
-                    "market_summary": { "type": "string" },
-                    "picks": {
-                        "type": "array",
-                        "items": {
-                            "type": "object",
-                            "properties": {
-                                "ticker": { "type": "string" },
-                                "note": { "type": "string", "description": "Analyst perspective with citations" }
-                            },
-                            "required": ["ticker", "note"]
-                        }
-                    }
-                },
-                "required": ["market_summary", "picks"]
-            }
-        }
-
-        lang_name = "Traditional Chinese (繁體中文)" if self.language in ['zh', 'zh_tw', 'chinese'] else "English"
+        news_source = "known context" if mode == "backtest" else "web-searched news"
 
         messages = [
             {"role": "system", "content": "You are a quantitative analyst."},
-            {"role": "user", "content": f"""
-                Macro Context: {macro_text}
-                Verified Strategy Picks: {json.dumps(picks_data)}
-                
-                Task:
-                1. Write a 'market_summary' based on the macro regime.
-                2. Write a 'note' for each pick combining technicals and web-searched news.
-                3. Language: {lang_name}.
-                4. CITATIONS: Use **[Source Name](URL)** format for references.
-                """}
+            {"role": "user", "content": self._report_tmpl.format(
+                macro=macro_text,
+                picks=fast_json.dumps(picks_data).decode('utf-8'),
+                news_source=news_source,
+            )}
         ]
 
         print("  -> Asking AI to summarize verified picks...")
-        result = self._call_ai(messages, schema=schema, plugins=[{"id": "web"}], max_retries=2)
+        if mode == "backtest":
+            result = self._call_ai(messages, schema=_REPORT_SCHEMA, max_retries=2, max_tokens=600)
+        else:
+            # Streamed: the report is the longest completion, and SSE deltas carry only
+            # content, so the full envelope is never buffered or parsed
+            result = self._call_ai(messages, schema=_REPORT_SCHEMA, plugins=[{"id": "web"}], max_retries=2, stream=True, cache_ttl=86400)
 
         if result:
-            summary_title = "市場機會：" if "Chinese" in lang_name else "Market Opportunity:"
-            report = f"**{summary_title}**\n{result['market_summary']}\n\n**🚀 Validated Picks:**\n\n"
+            parts = [f"**{self._summary_title}**\n{self._clean_text(result['market_summary'])}\n\n**🚀 Validated Picks:**\n\n"]
             
-            # Map original data for price/signal
-            tech_map = {p['ticker']: p for p in picks_data}
-            for p in result['picks']:
-                t = p['ticker']
-                tech = tech_map.get(t)
+            # Pair AI notes with the original price/signal. Models usually echo the
+            # picks in order, so zip directly and only build a lookup when they don't.
+            ai_picks = result['picks']
+            if len(ai_picks) == len(picks_data) and all(a['ticker'] == t['ticker'] for a, t in zip(ai_picks, picks_data)):
+                pairs = zip(ai_picks, picks_data)
+            else:
+                tech_map = {t['ticker']: t for t in picks_data}
+                pairs = ((p, tech_map.get(p['ticker'])) for p in ai_picks)
+            for p, tech in pairs:
                 if tech:
-                    report += f"1. **[{t}]** - ${tech['price']}\n   - **Strategy:** {tech['signal']}\n   - **Analyst Note:** {p['note']}\n\n"
-            return report.strip()
+                    parts.append(_PICK_TMPL.format(ticker=p['ticker'], price=tech['price'], signal=tech['signal'], note=self._clean_text(p['note'])))
+            return "".join(parts).strip()
         
         return None
 
+    def is_routine_alert(self, alert_data, news_context=None):
+        """
+        True when analyze_alert skips the model: no headlines to correlate and a move
+        below ALERT_LLM_MIN_MOVE_PCT. Its note is rule-based, so it carries no ai_model.
+        """
+        return not news_context and abs(float(alert_data.get('change', 0))) < self._alert_min_move
+
     def analyze_alert(self, ticker, alert_data, news_context=None):
         """
         Analyzes a sudden alert.
+        Returns None without an API key so the alert is sent unannotated.
         """
+        if not self._enabled:
+            return None
+
         price_str = f"{alert_data.get('price', 0):.2f}"
         change_str = f"{alert_data.get('change', 0):.2f}"
-        news_text = news_context if news_context else "No news found via API."
 
-        # Language instruction
-        lang_instruction = "Respond in English."
-        if self.language in ['zh', 'zh_tw', 'chinese']:
-            lang_instruction = "Respond in Traditional Chinese (繁體中文). Keep financial terms and ticker symbols in English."
-
-        schema = {
-            "name": "alert_analysis",
-            "strict": True,
-            "schema": {
-                "type": "object",
-                "properties": {
-                    "insight": { "type": "string", "description": "1-2 sentence explanation of the event" }
-                },
-                "required": ["insight"]
-            }
-        }
+        if self.is_routine_alert(alert_data, news_context):
+            # Fixed text, not model output, and labelled as such
+            return f"**Note (rule-based, no AI call):** No significant news found and the {change_str}% move is within typical daily volatility for {ticker}."
+
+        news_text = news_context if news_context else "No news found via API."
 
         messages = [
-            {"role": "system", "content": f"You are a concise financial news analyst. {lang_instruction}"},
-            {"role": "user", "content": f"Event: {ticker} Alert triggered.\nDetails: {alert_data['msg']}\nPrice: ${price_str} ({change_str}%)\nNews: {news_text}\n\nExplain if news correlates with price."}
+            {"role": "system", "content": self._alert_system_prompt},
+            {"role": "user", "content": _ALERT_TMPL.format(ticker=ticker, msg=alert_data['msg'], price=price_str, change=change_str, news=news_text)}
         ]
 
         print(f"  -> Asking AI to explain alert for {ticker}...")
-        result = self._call_ai(messages, schema=schema, plugins=[{"id": "web"}])
+        # A 1-2 sentence insight needs only a small output budget
+        result = self._call_ai(messages, schema=_ALERT_SCHEMA, plugins=[{"id": "web"}], stream=True, max_tokens=200, cache_ttl=3600)
         
-        if result and 'insight' in result:
-            return f"**AI Insight:** {result['insight']}"
+        if result:
+            return f"**AI Insight:** {self._clean_text(result['insight'])}"
         return "AI Analysis failed to provide an insight."
\ No newline at end of file
@@ -0,0 +1,81 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from . import fast_json
+
+class ResponseCache:
+    """
+    Two-layer cache for parsed AI responses: an in-memory LRU in front of
+    one JSON file per key on disk (survives across runs).
+    """
+    def __init__(self, cache_dir=".ai_cache", max_memory_items=256, default_ttl=7*86400):
+        self.cache_dir = cache_dir
+        self.max_memory_items = max_memory_items
+        self.default_ttl = default_ttl
+        self._memory = OrderedDict() # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(payload):
+        """
+        sha256 over a canonical JSON dump of the request fields that shape the answer.
+        Stays on the stdlib encoder so keys are identical with or without orjson.
+        """
+        raw = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        """Returns the cached value, or None on miss/expiry."""
+        now = time.time()
+        with self._lock:
+            hit = self._memory.get(key)
+            if hit:
+                if hit[0] > now:
+                    self._memory.move_to_end(key)
+                    return hit[1]
+                del self._memory[key]
+
+        try:
+            with open(self._path(key), 'rb') as f:
+                entry = fast_json.loads(f.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"⚠️ AI cache read failed for {key[:12]}: {e}")
+            return None
+
+        if entry.get('expires', 0) <= now:
+            return None
+
+        self._remember(key, entry['expires'], entry['value'])
+        return entry['value']
+
+    def set(self, key, value, ttl=None):
+        expires = time.time() + (self.default_ttl if ttl is None else ttl)
+        self._remember(key, expires, value)
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{self._path(key)}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(fast_json.dumps({'expires': expires, 'value': value}))
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            print(f"⚠️ AI cache write failed for {key[:12]}: {e}")
+
+    def clear_memory(self):
+        with self._lock:
+            self._memory.clear()
+
+    def _remember(self, key, expires, value):
+        with self._lock:
+            self._memory[key] = (expires, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_items:
+                self._memory.popitem(last=False)
@@ -1,12 +1,44 @@
+import os
+import re
+import bisect
+import numpy as np
 import pandas as pd
-from datetime import timedelta
+from datetime import date, timedelta
 import time
 from .data_loader import AlpacaLoader
 from .ai_analyst import AIAnalyst
+from .ai_cache import ResponseCache
 from .strategies.engineer import EngineerStrategy
 
+# The formatted response leads with its verdict line, so the first match is the verdict
+_VERDICT_RE = re.compile(r"✅ Agree|⚠️ Caution|❌ Disagree")
+
+def _parse_verdict(ai_response):
+    """Returns "✅ Agree", "⚠️ Caution" or "❌ Disagree" (also when no verdict is found)."""
+    m = _VERDICT_RE.search(ai_response)
+    return m.group(0) if m else "❌ Disagree"
+
+# Headline keywords for the coarse news-tone bucket of the setup cache
+_POSITIVE_WORDS = frozenset((
+    "beat", "beats", "surge", "surges", "soar", "soars", "rally", "rallies", "jump", "jumps",
+    "upgrade", "upgrades", "record", "raise", "raises", "strong", "growth", "bullish", "outperform",
+))
+_NEGATIVE_WORDS = frozenset((
+    "miss", "misses", "plunge", "plunges", "drop", "drops", "fall", "falls", "slump", "slumps",
+    "downgrade", "downgrades", "cut", "cuts", "lawsuit", "probe", "weak", "bearish", "recall",
+))
+_WORD_RE = re.compile(r"[a-z]+")
+
+def _news_tone(headlines):
+    """Keyword vote over a week's headlines: 'positive', 'negative' or 'neutral'."""
+    score = 0
+    for line in headlines:
+        words = set(_WORD_RE.findall(line.lower()))
+        score += len(words & _POSITIVE_WORDS) - len(words & _NEGATIVE_WORDS)
+    return "positive" if score > 0 else "negative" if score < 0 else "neutral"
+
 class Backtester:
-    def __init__(self, ticker, start_date=None, end_date=None, initial_capital=10000, use_ai=True, benchmark_tickers=['SPY'], verbose=False, slippage_pct=0.001):
+    def __init__(self, ticker, start_date=None, end_date=None, initial_capital=10000, use_ai=True, benchmark_tickers=['SPY'], verbose=False, slippage_pct=0.001, prefetch_ai=False, semantic_cache=False, loader=None, ai=None, strategy=None):
         self.ticker = ticker
         self.start_date = start_date
         self.end_date = end_date
@@ -18,30 +50,44 @@ class Backtester:
         self.benchmark_tickers = benchmark_tickers
         self.verbose = verbose
         self.slippage_pct = slippage_pct
+        self.prefetch_ai = prefetch_ai
+        self.semantic_cache = semantic_cache
         
-        # Dependencies
-        self.loader = AlpacaLoader()
-        self.ai = AIAnalyst()
-        self.strategy = EngineerStrategy()
+        # Dependencies (pass shared instances to skip the Alpaca auth round-trip per Backtester)
+        self.loader = loader or AlpacaLoader()
+        self.ai = ai or AIAnalyst()
+        self.strategy = strategy or EngineerStrategy()
+        self._owns_ai = ai is None # a shared AIAnalyst is closed by whoever created it
         
         # Stats
         self.trades = []
-        self.equity_curve = []
+        self.equity_curve = None # DataFrame of weekly equity, built by finalize_report()
+        self._equity = None # equity per simulated week, filled in by run()
+        self._sim_index = None # dates of the simulated weeks
         
         # Cache for data
         self.full_df = None
         self.benchmark_dfs = {}
+        self._bench_closes = {} # b_ticker -> (start_close, end_close) of the simulated period
+        self.ai_responses = {} # date_str -> prefetched AI response
+        self._news_dates = [] # sorted date_str of every headline in the simulation window
+        self._news_lines = [] # formatted headline, parallel to _news_dates
+        self._last_ai = None # (analysis, response) of the last bar sent to the AI
+        # Historical headlines for a closed period never change; keep them across runs
+        self._news_cache = ResponseCache(os.path.join(os.getenv('AI_CACHE_DIR', '.ai_cache'), 'news'))
+        # Setup fingerprint -> [[date_str, response], ...] of earlier reviews (see _ask_ai)
+        self._setup_cache = ResponseCache(os.path.join(os.getenv('AI_CACHE_DIR', '.ai_cache'), 'setups'))
 
     def load_data(self):
-        print(f"🔄 [Backtest] Loading historical data for {self.ticker}...")
-        self.full_df = self.loader.get_weekly_bars(self.ticker, limit=None)
-        
-        if self.benchmark_tickers:
-            for b_ticker in self.benchmark_tickers:
-                print(f"🔄 [Backtest] Loading benchmark data for {b_ticker}...")
-                df = self.loader.get_weekly_bars(b_ticker, limit=None)
-                if df is not None:
-                    self.benchmark_dfs[b_ticker] = df
+        # The ticker and its benchmarks share one multi-symbol request (a single round-trip)
+        symbols = [self.ticker] + [b for b in self.benchmark_tickers or [] if b != self.ticker]
+        print(f"🔄 [Backtest] Loading historical data for {', '.join(symbols)}...")
+        fetched = self.loader.get_weekly_bars_many(symbols)
+        self.full_df = fetched.get(self.ticker)
+
+        for b_ticker in self.benchmark_tickers or []: # Keep the requested order
+            if b_ticker in fetched:
+                self.benchmark_dfs[b_ticker] = fetched[b_ticker]
 
         if self.full_df is None or self.full_df.empty:
             raise ValueError(f"No data found for {self.ticker}")
@@ -55,30 +101,174 @@ class Backtester:
             for b_ticker in self.benchmark_dfs:
                 self.benchmark_dfs[b_ticker] = self.benchmark_dfs[b_ticker][self.benchmark_dfs[b_ticker].index <= self.end_date]
             
+        # First/last close of each benchmark over the simulated period (all the report needs)
+        for b_ticker, df in self.benchmark_dfs.items():
+            sim_df = df[df.index >= self.start_date] if self.start_date else df
+            if not sim_df.empty:
+                closes = sim_df['close']
+                self._bench_closes[b_ticker] = (closes.iloc[0], closes.iloc[-1])
+            
         print(f"✅ Data loaded: {len(self.full_df)} weeks of data.")
 
+        if self.use_ai:
+            self._load_news()
+
+    def _load_news(self):
+        """Fetches the whole simulation window's headlines once; weeks are sliced from it locally."""
+        first = self.full_df.index[0]
+        if self.start_date:
+            first = max(first, pd.Timestamp(self.start_date).tz_localize(first.tz))
+        start = (first - timedelta(days=7)).strftime('%Y-%m-%d')
+        end = self.full_df.index[-1].strftime('%Y-%m-%d')
+
+        limit = None # Every headline in the window; each week keeps its newest few
+        key = ResponseCache.make_key({"ticker": self.ticker, "start": start, "end": end, "limit": limit})
+        history = self._news_cache.get(key)
+        if history is None:
+            print(f"📰 [Backtest] Fetching news for {self.ticker} ({start} → {end})...")
+            history = self.loader.get_news_history(self.ticker, start, end, limit=limit)
+            if history:
+                ttl = 365 * 86400 if end < date.today().isoformat() else 3600
+                self._news_cache.set(key, history, ttl=ttl)
+
+        self._news_dates = [d for d, _ in history]
+        self._news_lines = [line for _, line in history]
+
+    def _simulation_bars(self, min_window=20):
+        """Yields (current_date, current_date_str, analysis) for each simulated week."""
+        # One vectorized pass gives every week's point-in-time analysis, instead of
+        # copying the growing prefix and recomputing all indicators per bar.
+        signals = self.strategy.analyze_vectorized(self.full_df).iloc[min_window:]
+        # Plain lists once up front: per-row pandas scalar access dominates otherwise
+        columns = list(signals.columns)
+        rows = signals.to_numpy(dtype=object).tolist()
+        dates = signals.index.to_pydatetime()
+        date_strs = signals.index.strftime('%Y-%m-%d').tolist()
+
+        # Skip weeks before start_date (warm-up period); the date strings are sorted
+        first = bisect.bisect_left(date_strs, self.start_date) if self.start_date else 0
+        self._sim_index = signals.index[first:]
+
+        for current_date, current_date_str, row in zip(dates[first:], date_strs[first:], rows[first:]):
+            yield current_date, current_date_str, dict(zip(columns, row))
+
+    def _backtest_config(self, current_date, current_date_str):
+        """Builds the point-in-time AI context (news for the week leading up to this Friday)."""
+        start_of_week = (current_date - timedelta(days=7)).strftime('%Y-%m-%d')
+        return {'date': current_date_str, 'news': self._news_slice(start_of_week, current_date_str)}
+
+    def _news_slice(self, start, end, limit=5):
+        """Newest `limit` prefetched headlines dated within [start, end] (history is ascending by publish time)."""
+        lo = bisect.bisect_left(self._news_dates, start)
+        hi = bisect.bisect_right(self._news_dates, end)
+        return self._news_lines[max(lo, hi - limit):hi][::-1]
+
+    def _ask_ai(self, current_date, current_date_str, analysis):
+        """
+        Returns the AI response for this bar, using the prefetched batch when available.
+        If the setup barely changed since the last reviewed bar, the last verdict is reused.
+        With semantic_cache, so is the latest earlier review of a similar setup (any run).
+        """
+        if current_date_str in self.ai_responses:
+            return self.ai_responses[current_date_str]
+
+        if self._last_ai and not self.ai.should_analyze(self._last_ai[0], analysis):
+            if self.verbose:
+                print(f"    ♻️  Setup unchanged since last review. Reusing previous AI verdict.")
+            return self._last_ai[1]
+
+        backtest_config = self._backtest_config(current_date, current_date_str)
+
+        if self.semantic_cache:
+            setup_key = self._setup_key(analysis, backtest_config['news'])
+            reviews = self._setup_cache.get(setup_key) or []
+            # Only reviews dated up to this bar: a later one was made knowing the future
+            past = [resp for d, resp in reviews if d <= current_date_str]
+            if past:
+                if self.verbose:
+                    print(f"    🧠 Similar setup reviewed before. Reusing its AI verdict.")
+                self._last_ai = (analysis, past[-1])
+                return past[-1]
+
+        response = self.ai.get_analysis(self.ticker, analysis, backtest_config)
+        self._last_ai = (analysis, response)
+
+        if self.semantic_cache and response.startswith("**Verdict:**"): # Skip failed/skipped calls
+            reviews = [r for r in reviews if r[0] != current_date_str] + [[current_date_str, response]]
+            reviews.sort(key=lambda r: r[0])
+            self._setup_cache.set(setup_key, reviews, ttl=365 * 86400)
+        return response
+
+    def _setup_key(self, analysis, news):
+        """Fingerprint of a setup: signal, whole RSI points, % distance from EMA and news tone."""
+        ema = analysis['ema']
+        return ResponseCache.make_key({
+            "model": self.ai.model,
+            "ticker": self.ticker,
+            "signal": analysis['signal'],
+            "rsi": f"{analysis['rsi']:.0f}",
+            "ema_dist": f"{(analysis['price'] - ema) / ema:.2f}",
+            "news": _news_tone(news),
+        })
+
+    def _get_ai_verdict(self, current_date, current_date_str, analysis):
+        """Asks the AI about this bar's signal and returns its parsed verdict."""
+        print(f"🤖 [AI] Analyzing {analysis['signal']} signal for {current_date_str}...")
+        ai_response = self._ask_ai(current_date, current_date_str, analysis)
+
+        # Verbose AI output
+        if self.verbose:
+            print(f"    📄 AI Raw Response:\n{ai_response}\n")
+
+        verdict = _parse_verdict(ai_response)
+        print(f"    -> AI Verdict: {verdict}")
+        return verdict
+
+    def prefetch_ai_responses(self):
+        """
+        Collects every BUY/SELL/PROFIT bar up front and submits all AI reviews in
+        one concurrent batch, so the simulation loop only replays the results.
+        SELL/PROFIT bars are included even if no position will be open at that point.
+        """
+        items = []
+        reused = {} # date_str -> date_str of the reviewed bar whose verdict it shares
+        last = None
+        for current_date, current_date_str, analysis in self._simulation_bars():
+            if analysis['signal'] in ("BUY", "SELL", "PROFIT"):
+                if last and not self.ai.should_analyze(last['analysis'], analysis):
+                    reused[current_date_str] = last['backtest_config']['date']
+                    continue
+                last = {
+                    'ticker': self.ticker,
+                    'analysis': analysis,
+                    'backtest_config': self._backtest_config(current_date, current_date_str)
+                }
+                items.append(last)
+
+        if not items:
+            return
+
+        print(f"📦 [AI] Submitting {len(items)} signal reviews as one batch ({len(reused)} unchanged setups reuse a verdict)...")
+        responses = self.ai.analyze_many(items)
+        for it, resp in zip(items, responses):
+            self.ai_responses[it['backtest_config']['date']] = resp
+        for date_str, source_date in reused.items():
+            self.ai_responses[date_str] = self.ai_responses[source_date]
+        print(f"✅ [AI] Batch complete: {len(responses)} responses cached.")
+
     def run(self):
         if self.full_df is None:
             self.load_data()
+
+        if self.use_ai and self.prefetch_ai:
+            self.prefetch_ai_responses()
             
         print(f"🚀 [Backtest] Starting simulation for {self.ticker} (${self.capital})...")
         print("-" * 50)
         
-        # Minimum window for indicators (e.g. 20 for EMA)
-        min_window = 20
-        
-        for i in range(min_window, len(self.full_df)):
-            # 1. Slice data up to current 'simulation time'
-            current_slice = self.full_df.iloc[:i+1].copy()
-            current_date = current_slice.index[-1]
-            current_date_str = current_date.strftime('%Y-%m-%d')
-            
-            # Skip if before start_date (Warm-up period)
-            if self.start_date and current_date_str < self.start_date:
-                continue
-            
-            # 2. Run Technical Strategy
-            analysis = self.strategy.analyze(current_slice)
+        # 1-2. Run the Technical Strategy for each simulated week (see _simulation_bars)
+        self._equity = np.full(len(self.full_df), np.nan) # upper bound on the simulated weeks
+        for i, (current_date, current_date_str, analysis) in enumerate(self._simulation_bars()):
             signal = analysis['signal']
             price = analysis['price']
             
@@ -88,43 +278,16 @@ class Backtester:
                 print(f"    📅 {current_date_str}: ${price:.2f} | {signal} | RSI: {analysis['rsi']:.1f}")
             
             # Record equity
-            current_equity = self.cash + (self.shares * price)
-            self.equity_curve.append({'date': current_date, 'equity': current_equity})
+            self._equity[i] = self.cash + (self.shares * price)
             
-            # 3. Decision Logic
-            action = "HOLD"
+            # 3. Decision Logic (a HOLD week only needs its equity recorded)
+            if signal == "HOLD":
+                continue
             
             # Case A: Strategy says BUY
             if signal == "BUY":
                 if self.cash > price:
-                    verdict = "✅ Agree" # Default if no AI
-                    
-                    if self.use_ai:
-                        print(f"🤖 [AI] Analyzing BUY signal for {current_date_str}...")
-                        # Fetch historical news for the week leading up to this Friday
-                        start_of_week = (current_date - timedelta(days=7)).strftime('%Y-%m-%d')
-                        news = self.loader.get_news_for_period(self.ticker, start_of_week, current_date_str)
-                        
-                        backtest_config = {
-                            'date': current_date_str,
-                            'news': news
-                        }
-                        
-                        ai_response = self.ai.get_analysis(self.ticker, analysis, backtest_config)
-                        
-                        # Verbose AI output
-                        if self.verbose:
-                            print(f"    📄 AI Raw Response:\n{ai_response}\n")
-
-                        # Simple parsing of AI verdict
-                        if "✅ Agree" in ai_response:
-                            verdict = "✅ Agree"
-                        elif "⚠️ Caution" in ai_response:
-                            verdict = "⚠️ Caution"
-                        else:
-                            verdict = "❌ Disagree"
-                            
-                        print(f"    -> AI Verdict: {verdict}")
+                    verdict = self._get_ai_verdict(current_date, current_date_str, analysis) if self.use_ai else "✅ Agree"
                     
                     # Execute Buy if AI agrees or warns
                     if verdict != "❌ Disagree":
@@ -155,28 +318,8 @@ class Backtester:
             # Case B: Strategy says SELL or PROFIT
             elif signal == "SELL" or signal == "PROFIT":
                 if self.shares > 0:
-                    verdict = "✅ Agree" # Default to selling
-                    
-                    if self.use_ai:
-                        print(f"🤖 [AI] Analyzing {signal} signal for {current_date_str}...")
-                        start_of_week = (current_date - timedelta(days=7)).strftime('%Y-%m-%d')
-                        news = self.loader.get_news_for_period(self.ticker, start_of_week, current_date_str)
-                        
-                        backtest_config = {'date': current_date_str, 'news': news}
-                        
-                        ai_response = self.ai.get_analysis(self.ticker, analysis, backtest_config)
-                        
-                        if self.verbose:
-                            print(f"    📄 AI Raw Response:\n{ai_response}\n")
-
-                        if "✅ Agree" in ai_response:
-                            verdict = "✅ Agree"
-                        elif "⚠️ Caution" in ai_response:
-                            verdict = "⚠️ Caution" 
-                        else:
-                            verdict = "❌ Disagree" 
-
-                        print(f"    -> AI Verdict: {verdict}")
+                    # Default to selling
+                    verdict = self._get_ai_verdict(current_date, current_date_str, analysis) if self.use_ai else "✅ Agree"
 
                     # Execute Sell UNLESS AI strongly disagrees
                     if verdict == "❌ Disagree":
@@ -190,6 +333,8 @@ class Backtester:
             # Case C: Stop Loss check
             # EngineerStrategy returns 'SELL' if price < stop_loss, so covered above.
 
+        if self._owns_ai:
+            self.ai.close()
         self.finalize_report()
 
     def buy(self, date, price, quantity, reason):
@@ -232,6 +377,8 @@ class Backtester:
             self.total_cost = 0
 
     def finalize_report(self):
+        self.equity_curve = pd.DataFrame({'equity': self._equity[:len(self._sim_index)]}, index=self._sim_index)
+
         final_price = self.full_df.iloc[-1]['close']
         total_equity = self.cash + (self.shares * final_price)
         pnl_pct = ((total_equity - self.capital) / self.capital) * 100
@@ -249,19 +396,10 @@ class Backtester:
         # Benchmark comparison
         if self.benchmark_dfs:
             print("-" * 20)
-            for b_ticker, df in self.benchmark_dfs.items():
-                if not df.empty:
-                    # Filter benchmark data to match simulation period
-                    sim_df = df
-                    if self.start_date:
-                        sim_df = df[df.index >= self.start_date]
-                        
-                    if not sim_df.empty:
-                        start_price = sim_df.iloc[0]['close']
-                        end_price = sim_df.iloc[-1]['close']
-                        bench_return = ((end_price - start_price) / start_price) * 100
-                        alpha = pnl_pct - bench_return
-                        print(f"Benchmark ({b_ticker:4}) Return: {bench_return:+.2f}% | Alpha: {alpha:+.2f}%")
+            for b_ticker, (start_price, end_price) in self._bench_closes.items():
+                bench_return = ((end_price - start_price) / start_price) * 100
+                alpha = pnl_pct - bench_return
+                print(f"Benchmark ({b_ticker:4}) Return: {bench_return:+.2f}% | Alpha: {alpha:+.2f}%")
 
         print("-" * 20)
         print(f"Total Trades:     {len(self.trades)}")
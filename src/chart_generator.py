@@ -1,8 +1,32 @@
+import matplotlib
+matplotlib.use('Agg') # Headless raster backend; charts only ever go to PNG buffers
 import mplfinance as mpf
 import io
 import pandas as pd
 import numpy as np
 
+# Custom TradingView Style (immutable, so built once at import)
+# Colors based on TradingView Dark Theme
+_MC = mpf.make_marketcolors(
+    up='#089981',        # TV Green
+    down='#F23645',      # TV Red
+    edge={'up': '#089981', 'down': '#F23645'},
+    wick={'up': '#089981', 'down': '#F23645'},
+    volume={'up': '#089981', 'down': '#F23645'},
+    ohlc='inherit'
+)
+
+_STYLE = mpf.make_mpf_style(
+    base_mpf_style='nightclouds',
+    marketcolors=_MC,
+    facecolor='#131722',      # TV Dark Background
+    edgecolor='#2a2e39',      # Border color
+    gridcolor='#2a2e39',      # Grid color
+    gridstyle='dotted',
+    y_on_right=True,
+    rc={'axes.labelsize': 10, 'xtick.labelsize': 9, 'ytick.labelsize': 9}
+)
+
 class ChartGenerator:
     def generate_chart(self, ticker, df, analysis):
         """
@@ -14,29 +38,7 @@ class ChartGenerator:
         if not isinstance(plot_df.index, pd.DatetimeIndex):
             plot_df.index = pd.to_datetime(plot_df.index)
 
-        # 2. Define Custom TradingView Style
-        # Colors based on TradingView Dark Theme
-        mc = mpf.make_marketcolors(
-            up='#089981',        # TV Green
-            down='#F23645',      # TV Red
-            edge={'up': '#089981', 'down': '#F23645'},
-            wick={'up': '#089981', 'down': '#F23645'},
-            volume={'up': '#089981', 'down': '#F23645'},
-            ohlc='inherit'
-        )
-
-        s = mpf.make_mpf_style(
-            base_mpf_style='nightclouds',
-            marketcolors=mc,
-            facecolor='#131722',      # TV Dark Background
-            edgecolor='#2a2e39',      # Border color
-            gridcolor='#2a2e39',      # Grid color
-            gridstyle='dotted',
-            y_on_right=True,
-            rc={'axes.labelsize': 10, 'xtick.labelsize': 9, 'ytick.labelsize': 9}
-        )
-
-        # 3. Add Plots (EMA & Signals)
+        # 2. Add Plots (EMA & Signals)
         addplots = []
         
         # EMA Line (Bright Blue)
@@ -88,7 +90,7 @@ class ChartGenerator:
                 color='#F23645' # Match Candle Red
             ))
 
-        # 4. Generate Plot
+        # 3. Generate Plot
         buf = io.BytesIO()
         
         strategy_name = "Engineer Strategy"
@@ -97,16 +99,20 @@ class ChartGenerator:
         mpf.plot(
             plot_df,
             type='candle',
-            style=s,
+            style=_STYLE,
             addplot=addplots,
             title=dict(title=title, color='white', size=12),
             ylabel='', # Hide label to look cleaner
             volume=True,
-            savefig=dict(fname=buf, dpi=120, bbox_inches='tight', facecolor='#131722'), # Ensure outer padding matches bg
+            # Ensure outer padding matches bg. The fastest zlib level keeps PNG encoding
+            # from dominating the render (a slightly larger file, same pixels)
+            savefig=dict(fname=buf, dpi=120, bbox_inches='tight', facecolor='#131722',
+                         pil_kwargs={'compress_level': 1, 'optimize': False}),
             figsize=(10, 5),
             datetime_format='%b %d',
             tight_layout=True,
-            scale_width_adjustment=dict(volume=0.6, candle=1.0) # Adjust bar widths
+            scale_width_adjustment=dict(volume=0.6, candle=1.0), # Adjust bar widths
+            closefig=True # Free the figure once saved, so long scans don't accumulate them
         )
         
         buf.seek(0)
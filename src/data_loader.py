@@ -2,6 +2,10 @@ import alpaca_trade_api as tradeapi
 import pandas as pd
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Alpaca aggregates week bars server-side (about 5x fewer rows than daily + local resample)
+_WEEK = tradeapi.TimeFrame(1, tradeapi.TimeFrameUnit.Week)
 
 class AlpacaLoader:
     def __init__(self):
@@ -66,32 +70,99 @@ class AlpacaLoader:
             print(f"❌ Error fetching {ticker}: {e}")
             return None
 
+    def get_daily_bars_many(self, tickers, days=30):
+        """
+        Daily bars (last `days` calendar days) for several tickers from a single multi-symbol request.
+        Returns {ticker: DataFrame}; tickers without data are left out.
+        """
+        try:
+            # Add delay to avoid rate limits
+            time.sleep(0.3)
+
+            from datetime import datetime, timedelta
+            start_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+
+            daily_bars = self.api.get_bars(
+                list(tickers),
+                tradeapi.TimeFrame.Day,
+                start=start_date,
+                feed='iex'
+            ).df
+        except Exception as e:
+            print(f"❌ Error fetching {', '.join(tickers)}: {e}")
+            return {}
+
+        if daily_bars.empty:
+            print(f"⚠️ Warning: No data found for {', '.join(tickers)}")
+            return {}
+
+        # Ensure index is datetime
+        if not isinstance(daily_bars.index, pd.DatetimeIndex):
+            daily_bars.index = pd.to_datetime(daily_bars.index)
+
+        return {ticker: bars for ticker, bars in daily_bars.groupby('symbol')}
+
     def get_weekly_bars(self, ticker, limit=100):
         """Get weekly bars, and convert to DataFrame"""
         try:
-            # Fetch Daily data (default 2 years)
-            daily_bars = self.get_daily_bars(ticker)
-            
-            if daily_bars is None or daily_bars.empty:
+            weekly_bars = self._fetch_weekly(ticker)
+
+            if weekly_bars.empty:
+                print(f"⚠️ Warning: No data found for {ticker}")
                 return None
-            
-            # Resample to Weekly (Ending on Friday)
-            weekly_bars = daily_bars.resample('W-FRI').agg({
-                'open': 'first',
-                'high': 'max',
-                'low': 'min',
-                'close': 'last',
-                'volume': 'sum'
-            })
-            
-            # Drop rows with NaN (in case of empty weeks)
-            weekly_bars.dropna(inplace=True)
 
-            return weekly_bars
+            return self._to_week_end(weekly_bars)
         except Exception as e:
             print(f"❌ Error fetching {ticker}: {e}")
             return None
 
+    def get_weekly_bars_many(self, tickers):
+        """
+        Weekly bars for several tickers from a single multi-symbol request.
+        Returns {ticker: DataFrame}; tickers without data are left out.
+        """
+        try:
+            weekly_bars = self._fetch_weekly(list(tickers))
+        except Exception as e:
+            print(f"❌ Error fetching {', '.join(tickers)}: {e}")
+            return {}
+
+        if weekly_bars.empty:
+            print(f"⚠️ Warning: No data found for {', '.join(tickers)}")
+            return {}
+
+        return {ticker: self._to_week_end(bars) for ticker, bars in weekly_bars.groupby('symbol')}
+
+    def _fetch_weekly(self, symbols):
+        """Raw weekly bars (2 years) for one symbol or a list, straight from Alpaca's week timeframe."""
+        # Add delay to avoid rate limits
+        time.sleep(0.3)
+
+        from datetime import datetime, timedelta
+        start_date = (datetime.now() - timedelta(days=730)).strftime('%Y-%m-%d')
+
+        return self.api.get_bars(
+            symbols,
+            _WEEK,
+            start=start_date,
+            feed='iex'
+        ).df
+
+    @staticmethod
+    def _to_week_end(weekly_bars):
+        """
+        OHLCV columns, indexed by the Friday that closes each week.
+        Alpaca stamps a week bar with its first day; the Friday label (as resample('W-FRI')
+        gave) keeps a bar from being dated before the closes it contains.
+        """
+        if not isinstance(weekly_bars.index, pd.DatetimeIndex):
+            weekly_bars.index = pd.to_datetime(weekly_bars.index)
+
+        idx = weekly_bars.index
+        weekly_bars = weekly_bars[['open', 'high', 'low', 'close', 'volume']].copy()
+        weekly_bars.index = (idx.normalize() + pd.to_timedelta((4 - idx.dayofweek) % 7, unit='D')).rename(idx.name)
+        return weekly_bars.sort_index()
+
     def get_clock(self):
         """Get market clock"""
         try:
@@ -155,4 +226,53 @@ class AlpacaLoader:
             return formatted_news
         except Exception as e:
             print(f"⚠️ Historical news fetch failed for {ticker}: {str(e)}")
-            return []
\ No newline at end of file
+            return []
+
+    def get_news_history(self, ticker, start_date, end_date, limit=None, chunk_days=30):
+        """
+        Get every headline in a date range (for pre-fetching a whole backtest window).
+        The range is split into chunk_days pieces fetched concurrently; each piece is paged
+        through in full (limit=None) or capped at its newest `limit` headlines.
+        Returns [date_str, line] pairs sorted oldest first by publish time; the lines match get_news_for_period().
+        """
+        from datetime import datetime, timedelta
+
+        # Contiguous [start, next start) pieces; the last one ends at end_date like a single call would
+        first = datetime.strptime(start_date, '%Y-%m-%d')
+        last = datetime.strptime(end_date, '%Y-%m-%d')
+        bounds = []
+        while first < last:
+            stop = min(first + timedelta(days=chunk_days), last)
+            bounds.append((first.strftime('%Y-%m-%d'), stop.strftime('%Y-%m-%d')))
+            first = stop
+        if not bounds:
+            bounds.append((start_date, end_date))
+
+        def fetch(piece):
+            return self.api.get_news(
+                symbol=ticker,
+                start=piece[0],
+                end=piece[1],
+                limit=limit, # None: the SDK follows next_page_token to the end of the piece
+                include_content=False
+            )
+
+        try:
+            with ThreadPoolExecutor(max_workers=min(len(bounds), 4)) as ex:
+                pieces = list(ex.map(fetch, bounds))
+        except Exception as e:
+            print(f"⚠️ Historical news fetch failed for {ticker}: {str(e)}")
+            return []
+
+        # Pieces share their boundary instant, so an article can come back twice
+        by_id = {}
+        for news_list in pieces:
+            for n in news_list or []:
+                by_id[n.id] = n
+        news = sorted(by_id.values(), key=lambda n: n.created_at)
+
+        history = []
+        for n in news:
+            date_str = n.created_at.strftime('%Y-%m-%d')
+            history.append([date_str, f"• [{date_str}] {n.headline} - {n.source}"])
+        return history
@@ -0,0 +1,25 @@
+"""
+JSON encode/decode helpers for hot paths.
+Uses orjson when it is installed and falls back to the standard library.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so this catches both.
+JSONDecodeError = json.JSONDecodeError
+
+def dumps(obj):
+    """Serializes obj to compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def loads(data):
+    """Parses JSON from str or bytes."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
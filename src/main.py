@@ -1,10 +1,13 @@
 import os
 import sys
 import argparse
-import tempfile
+import contextlib
+import multiprocessing
 import yfinance as yf
 from datetime import datetime
-from dotenv import load_dotenv, dotenv_values
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from dotenv import load_dotenv
+from filelock import FileLock
 from src.data_loader import AlpacaLoader
 from src.strategies import EngineerStrategy
 from src.strategies.watchdog import WatchdogStrategy
@@ -15,16 +18,62 @@ from src.notifier import DiscordNotifier
 from src.chart_generator import ChartGenerator
 from src.ai_analyst import AIAnalyst
 
-# Force load env vars with debug
-print(f"DEBUG: CWD = {os.getcwd()}")
-env_path = os.path.join(os.getcwd(), ".env")
-print(f"DEBUG: Looking for .env at {env_path}, exists: {os.path.exists(env_path)}")
+def _scan_weekly(ticker, loader, engineer_strategy, sizer, macro_regime):
+    """
+    Fetch, analyze and size one WEEKLY ticker. Returns (df, analysis), or (None, None) without data.
+    Only does network and pandas work, so it is safe to run on a worker thread.
+    """
+    print(f"Processing {ticker}...")
 
-config = dotenv_values(env_path)
-print(f"DEBUG: Keys found in .env: {list(config.keys())}")
+    # Step A: Get Data
+    df = loader.get_weekly_bars(ticker)
+    if df is None:
+        return None, None
 
-for k, v in config.items():
-    os.environ[k] = v
+    # Step B: Analyze
+    # Non-HOLD tickers get a chart, so their df keeps the EMA column it plots
+    analysis = engineer_strategy.analyze(df, attach_indicators='signal')
+
+    # Step B.3: Position Sizing (Risk Management)
+    # Only calculate if we are considering a position (BUY or even watching)
+    # We pass the Macro Regime we found earlier.
+    if analysis['signal'] == 'BUY':
+        sizing = sizer.calculate_size(
+            price=analysis['price'], 
+            stop_loss=analysis['stop_loss'], 
+            macro_regime=macro_regime
+        )
+        analysis['sizing'] = sizing
+        print(f"    -> ⚖️ {ticker} Sizing: Buy {sizing['shares']} shares ({sizing['message']})")
+    else:
+        analysis['sizing'] = None
+
+    return df, analysis
+
+def _scan_daily(ticker, df, loader, watchdog):
+    """
+    Run the Watchdog over one DAILY ticker's bars (None without data).
+    Returns (alert, news_text); alert is None when normal.
+    """
+    print(f"Processing {ticker}...")
+
+    # Step A: Daily Data comes from the batched fetch (14 days minimum for RSI)
+    if df is None:
+        print(f"⚠️ Warning: No data found for {ticker}")
+        return None, None
+
+    # Step B: Analyze with Watchdog (on the raw column arrays)
+    alert = watchdog.analyze(ticker, df['close'].to_numpy(dtype='float64'), df['volume'].to_numpy(dtype='float64'))
+    if not alert:
+        print(f"  -> {ticker} Normal.")
+        return None, None
+
+    print(f"  -> 🚨 {ticker} ALERT: {alert['msg']}")
+
+    # Fetch News
+    print(f"    -> Fetching news for {ticker}...")
+    news_text = loader.get_latest_news(ticker)
+    return alert, news_text
 
 def main():
     parser = argparse.ArgumentParser()
@@ -34,19 +83,34 @@ def main():
     
     mode = args.mode
     debug = args.debug
+
+    # Load .env here rather than at import time; its values win over the inherited environment
+    env_path = os.path.join(os.getcwd(), ".env")
+    if debug:
+        print(f"DEBUG: CWD = {os.getcwd()}")
+        print(f"DEBUG: Looking for .env at {env_path}, exists: {os.path.exists(env_path)}")
+    load_dotenv(env_path, override=True)
+
     print(f"🚀 Starting Sentinel in {mode} mode.{' (DEBUG MODE ON)' if debug else ''}")
 
-    # Fix for yfinance 'database is locked' in GitHub Actions
-    # Set a unique cache directory for this run
-    cache_dir = os.path.join(tempfile.gettempdir(), f"yf_cache_{os.getpid()}")
+    # Fix for yfinance 'database is locked' in GitHub Actions: give yfinance its own
+    # tz cache directory, kept in one stable place so timezones resolve once across runs.
+    # Every run on the machine (e.g. WEEKLY and DAILY cron jobs) shares it, so yfinance
+    # work holds a file lock and two processes never write its sqlite caches at once.
+    cache_dir = os.path.join(os.getenv('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'stock-sentinel', 'yf')
+    yf_lock = contextlib.nullcontext()
     try:
+        os.makedirs(cache_dir, exist_ok=True)
         yf.set_tz_cache_location(cache_dir)
-        print(f"DEBUG: yfinance cache set to {cache_dir}")
+        yf_lock = FileLock(cache_dir + '.lock')
+        if debug:
+            print(f"DEBUG: yfinance cache set to {cache_dir}")
     except Exception as e:
         print(f"DEBUG: Could not set yfinance cache: {e}")
 
     # Debug: Check env vars
-    print(f"DEBUG: ALPACA_KEY status: {'FOUND' if os.getenv('ALPACA_KEY') else 'MISSING'}")
+    if debug:
+        print(f"DEBUG: ALPACA_KEY status: {'FOUND' if os.getenv('ALPACA_KEY') else 'MISSING'}")
     
     # 1. Initialize components
     loader = AlpacaLoader()
@@ -66,7 +130,8 @@ def main():
 
     # 2. Macro Analysis (The "Strategic View")
     print("🌍 Analyzing Macro Environment...")
-    macro_data = macro_sentinel.analyze()
+    with yf_lock:
+        macro_data = macro_sentinel.analyze()
     print(f"  -> Regime: {macro_data['regime']}")
     print(f"  -> Reason: {macro_data['reason']}")
     
@@ -98,90 +163,107 @@ def main():
 
     print(f"🔍 Scanning list: {watchlist}")
     results = {}
+    ai_queue = [] # WEEKLY signals awaiting an AI second opinion
+    alert_queue = [] # DAILY alerts awaiting an AI explanation
 
     # 4. Process each ticker
-    for ticker in watchlist:
-        print(f"Processing {ticker}...")
-        
+    # Fetching and analysis are network-bound, so tickers are scanned on a thread pool and
+    # consumed in watchlist order. Charts are CPU-bound (and pyplot is not thread-safe), so
+    # they render in worker processes while the scan and AI calls carry on.
+    # Workers come from forkserver (spawn where it is unavailable), never a plain fork: the
+    # first chart job starts them while the scan threads may be holding requests/yfinance locks
+    start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    chart_pool = ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context(start_method)) if mode == 'WEEKLY' else None
+    chart_jobs = {} # ticker -> Future of the PNG buffer
+    workers = max(1, min(len(watchlist), int(os.getenv('SENTINEL_WORKERS', '8'))))
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            if mode == 'WEEKLY':
+                scans = ex.map(lambda t: _scan_weekly(t, loader, engineer_strategy, sizer, macro_data['regime']), watchlist)
+            else:
+                # One multi-symbol request for every ticker's daily bars; the pool is left with
+                # the news fetches for tickers that alert
+                daily_bars = loader.get_daily_bars_many(watchlist, days=30)
+                scans = ex.map(lambda t: _scan_daily(t, daily_bars.get(t), loader, watchdog), watchlist)
+
+            for ticker, scan in zip(watchlist, scans):
+                if mode == 'WEEKLY':
+                    df, analysis = scan
+                    if df is None: continue
+
+                    # Step C: Generate Chart & AI Analysis if Interesting
+                    if analysis['signal'] != "HOLD":
+                        print(f"  -> {ticker} {analysis['signal']} detected! Generating chart & AI analysis...")
+
+                        # Generate Chart (collected before the report is sent; the analysis
+                        # is copied because it keeps being filled in while the job is queued)
+                        chart_jobs[ticker] = chart_pool.submit(chart_gen.generate_chart, ticker, df, dict(analysis))
+
+                        # Queue AI Opinion (requests for all signals are sent concurrently after the loop)
+                        ai_queue.append({'ticker': ticker, 'analysis': analysis})
+                    else:
+                        analysis['chart'] = None
+                        analysis['ai_comment'] = None
+                        analysis['ai_model'] = None
+
+                    results[ticker] = analysis
+                    print(f"  -> {ticker} {analysis['signal']}: {analysis['reason']}")
+
+                elif mode == 'DAILY':
+                    alert, news_text = scan
+                    if alert:
+                        # Queue AI Analysis (alerts are explained concurrently after the loop)
+                        alert_queue.append({'ticker': ticker, 'alert': alert, 'news': news_text})
+                        results[ticker] = alert
+
+        # Step B.2: Event Backtest (Smart Money Context), only for actionable signals and
+        # with one batched history download; Yahoo is not hit at all for HOLD tickers
         if mode == 'WEEKLY':
-            # Step A: Get Data
-            df = loader.get_weekly_bars(ticker)
-            if df is None: continue
+            actionable = [t for t, res in results.items() if res['signal'] != "HOLD"]
+            if actionable:
+                print(f"  -> Running Event Backtest for {actionable}...")
+            with yf_lock:
+                event_stats_by_ticker = event_backtester.analyze_batch(actionable)
+            for ticker, analysis in results.items():
+                event_stats = event_stats_by_ticker.get(ticker)
+                if event_stats is None:
+                    analysis['event_stats'] = event_backtester.empty_result("Skipped for HOLD signal")
+                    continue
+                analysis['event_stats'] = event_stats
+                print(f"    -> {ticker} Event Backtest: {event_stats['message']}")
 
-            # Step B: Analyze
-            analysis = engineer_strategy.analyze(df)
-            
-            # Step B.2: Event Backtest (Smart Money Context)
-            print(f"  -> Running Event Backtest for {ticker}...")
-            event_stats = event_backtester.analyze_earnings_behavior(ticker)
-            analysis['event_stats'] = event_stats
-            print(f"    -> {event_stats['message']}")
-
-            # Step B.3: Position Sizing (Risk Management)
-            # Only calculate if we are considering a position (BUY or even watching)
-            # We pass the Macro Regime we found earlier.
-            if analysis['signal'] == 'BUY':
-                sizing = sizer.calculate_size(
-                    price=analysis['price'], 
-                    stop_loss=analysis['stop_loss'], 
-                    macro_regime=macro_data['regime']
-                )
-                analysis['sizing'] = sizing
-                print(f"    -> ⚖️ Sizing: Buy {sizing['shares']} shares ({sizing['message']})")
-            else:
-                analysis['sizing'] = None
+        # 4.5 Get AI Opinions for all actionable signals, several tickers per request
+        if ai_queue:
+            print(f"🤖 Asking AI for opinions on {[it['ticker'] for it in ai_queue]}...")
+            ai_comments = ai_analyst.get_analyses(ai_queue)
+            for it in ai_queue:
+                it['analysis']['ai_comment'] = ai_comments.get(it['ticker'])
+                it['analysis']['ai_model'] = ai_analyst.model
 
-            # Step C: Generate Chart & AI Analysis if Interesting
-            if analysis['signal'] != "HOLD":
-                print(f"  -> {analysis['signal']} detected! Generating chart & AI analysis...")
-                
-                # Generate Chart
-                chart_buf = chart_gen.generate_chart(ticker, df, analysis)
-                analysis['chart'] = chart_buf
-                
-                # Get AI Opinion
-                print(f"  -> Asking AI for opinion on {ticker}...")
-                ai_comment = ai_analyst.get_analysis(ticker, analysis)
-                analysis['ai_comment'] = ai_comment
-                analysis['ai_model'] = ai_analyst.model
-            else:
-                analysis['chart'] = None
-                analysis['ai_comment'] = None
-                analysis['ai_model'] = None
-                
-            results[ticker] = analysis
-            print(f"  -> {analysis['signal']}: {analysis['reason']}")
-            
-        elif mode == 'DAILY':
-            # Step A: Get Daily Data (14 days minimum for RSI)
-            df = loader.get_daily_bars(ticker, days=30)
-            if df is None: continue
-            
-            # Step B: Analyze with Watchdog
-            alert = watchdog.analyze(ticker, df)
-            
-            if alert:
-                print(f"  -> 🚨 ALERT: {alert['msg']}")
-                
-                # 1. Fetch News
-                print(f"    -> Fetching news for {ticker}...")
-                news_text = loader.get_latest_news(ticker)
-                
-                # 2. AI Analysis
-                print(f"    -> Analyzing alert with AI...")
-                ai_insight = ai_analyst.analyze_alert(ticker, alert, news_text)
-                
-                # 3. Append to Alert Msg
-                if news_text:
-                    alert['msg'] += f"\n\n📰 **News Context:**\n{news_text}"
-                
+        # 4.6 Explain all watchdog alerts in parallel
+        if alert_queue:
+            print(f"🤖 Analyzing alerts with AI for {[it['ticker'] for it in alert_queue]}...")
+            ai_insights = ai_analyst.analyze_alerts(alert_queue)
+            for it, ai_insight in zip(alert_queue, ai_insights):
+                alert = it['alert']
+                # Append to Alert Msg
+                msg_parts = [alert['msg']]
+                if it['news']:
+                    msg_parts.append(f"📰 **News Context:**\n{it['news']}")
                 if ai_insight:
-                    alert['msg'] += f"\n\n{ai_insight}"
-                    alert['ai_model'] = ai_analyst.model
-                    
-                results[ticker] = alert
-            else:
-                print(f"  -> Normal.")
+                    msg_parts.append(ai_insight)
+                    # Rule-based notes for routine alerts were never produced by the model
+                    if not ai_analyst.is_routine_alert(alert, it['news']):
+                        alert['ai_model'] = ai_analyst.model
+                alert['msg'] = "\n\n".join(msg_parts)
+
+        if chart_pool:
+            for ticker, job in chart_jobs.items():
+                results[ticker]['chart'] = job.result()
+    finally:
+        # Also on errors: a failed scan or AI step must not leave the chart workers running
+        if chart_pool:
+            chart_pool.shutdown(cancel_futures=True)
 
     # 5. Send Notification
     # Inject Macro Data into the results so Notifier sends the visual report in both modes.
@@ -196,37 +278,45 @@ def main():
         print(f"  -> AI suggested candidates: {candidates}")
         
         verified_picks = []
+        new_cands = []
         for cand in candidates:
             cand = cand.upper()
-            if cand in watchlist:
-                continue # Already analyzed
-            
-            print(f"  -> Validating candidate {cand} with Engineer Strategy...")
-            df_cand = loader.get_weekly_bars(cand)
-            if df_cand is None:
-                print(f"    -> No data found for {cand}. Skipping.")
-                continue
-                
-            analysis_cand = engineer_strategy.analyze(df_cand)
-            
-            # We filter for positive or interesting setups.
-            # Engineer Strategy returns: BUY (success), PROFIT (warning), HOLD (info/warning), SELL (danger)
-            # We want to recommend things that are BUY or maybe just not SELL/Danger?
-            # Let's be strict: Only BUY or PROFIT (if momentum is strong).
-            if analysis_cand['signal'] in ['BUY', 'PROFIT']:
-                print(f"    -> ✅ {cand} Passed! Signal: {analysis_cand['signal']}")
-                verified_picks.append({
-                    'ticker': cand,
-                    'analysis': analysis_cand
-                })
-            else:
-                print(f"    -> ❌ {cand} Rejected. Signal: {analysis_cand['signal']} ({analysis_cand['reason']})")
-            
-            # Limit to top 3 verified picks
-            if len(verified_picks) >= 3:
-                print("  -> Found 3 verified picks. Stopping search.")
-                break
-        
+            if cand not in watchlist and cand not in new_cands:
+                new_cands.append(cand) # Watchlist tickers are already analyzed
+
+        if new_cands:
+            with ThreadPoolExecutor(max_workers=min(len(new_cands), workers)) as ex:
+                # Fetch every candidate up front, then validate in the AI's order
+                futures = [(cand, ex.submit(loader.get_weekly_bars, cand)) for cand in new_cands]
+                for i, (cand, fut) in enumerate(futures):
+                    print(f"  -> Validating candidate {cand} with Engineer Strategy...")
+                    df_cand = fut.result()
+                    if df_cand is None:
+                        print(f"    -> No data found for {cand}. Skipping.")
+                        continue
+
+                    analysis_cand = engineer_strategy.analyze(df_cand)
+
+                    # We filter for positive or interesting setups.
+                    # Engineer Strategy returns: BUY (success), PROFIT (warning), HOLD (info/warning), SELL (danger)
+                    # We want to recommend things that are BUY or maybe just not SELL/Danger?
+                    # Let's be strict: Only BUY or PROFIT (if momentum is strong).
+                    if analysis_cand['signal'] in ['BUY', 'PROFIT']:
+                        print(f"    -> ✅ {cand} Passed! Signal: {analysis_cand['signal']}")
+                        verified_picks.append({
+                            'ticker': cand,
+                            'analysis': analysis_cand
+                        })
+                    else:
+                        print(f"    -> ❌ {cand} Rejected. Signal: {analysis_cand['signal']} ({analysis_cand['reason']})")
+
+                    # Limit to top 3 verified picks
+                    if len(verified_picks) >= 3:
+                        print("  -> Found 3 verified picks. Stopping search.")
+                        for _, pending in futures[i + 1:]:
+                            pending.cancel()
+                        break
+
         if verified_picks:
             rec_text = ai_analyst.generate_recommendation_report(verified_picks, macro_data)
             if rec_text:
@@ -234,6 +324,8 @@ def main():
         else:
             print("  -> No AI candidates passed the strategy validation.")
 
+    ai_analyst.close()
+    notifier.close()
     print("✅ Scan complete.")
 
 if __name__ == "__main__":
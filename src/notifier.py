@@ -1,7 +1,24 @@
 import requests
 import os
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
 import pytz
 from datetime import datetime
+from . import fast_json
+
+# Discord's per-message limits: 10 embeds, 6000 characters across all of them
+_MAX_EMBEDS = 10
+_MAX_EMBED_CHARS = 6000
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+def _embed_chars(embed):
+    """Characters Discord counts against the per-message embed limit."""
+    n = len(embed.get('title', '')) + len(embed.get('description', ''))
+    n += len(embed.get('footer', {}).get('text', ''))
+    for field in embed.get('fields', []):
+        n += len(field['name']) + len(field['value'])
+    return n
 
 class DiscordNotifier:
     def __init__(self):
@@ -9,6 +26,59 @@ class DiscordNotifier:
         self.user_id = os.getenv('DISCORD_USER_ID')
         self.avatar_url = os.getenv('DISCORD_AVATAR_URL', 'https://i.imgur.com/dJouyw2.jpeg')
         self.timezone = pytz.timezone('America/Los_Angeles')
+        # Per-bot message envelope (name, avatar, @mention), built once; each send only adds embeds
+        mention = {"content": f"<@{self.user_id}>"} if self.user_id else {}
+        self._envelopes = {
+            'macro': {"username": "Macro Sentinel 🦅", "avatar_url": self.avatar_url},
+            'watchdog': {"username": "Sentinel Watchdog 🐕", "avatar_url": self.avatar_url, **mention},
+            'signal': {"username": "Stock Sentinel 🤖", "avatar_url": self.avatar_url, **mention},
+            'strategist': {"username": "Sentinel Strategist 🔮", "avatar_url": self.avatar_url},
+        }
+        self._icon_map = {
+            "success": "🟢", "danger": "🔴", "warning": "🟠", "info": "⚪"
+        }
+        self._color_map = {
+            "success": 0x2ecc71, # Green
+            "danger": 0xe74c3c,  # Red
+            "warning": 0xf1c40f, # Yellow
+            "info": 0x3498db     # Blue
+        }
+
+        # One kept-alive connection for every webhook post instead of a TLS handshake each
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=8,
+            # Discord rate limits (429, with Retry-After) and transient 5xx are retried with backoff
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.3,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=frozenset(["POST"]),
+                respect_retry_after_header=True,
+                raise_on_status=False,
+            ),
+        ))
+        # Webhook posts drain here while the scan carries on; close() waits for them
+        self._pool = ThreadPoolExecutor(max_workers=4)
+        self._pending = []
+
+    def close(self):
+        """Waits for queued posts (re-raising any error building them), then releases the connection."""
+        try:
+            for fut in self._pending:
+                fut.result()
+        finally:
+            self._pending = []
+            self._pool.shutdown()
+            self.session.close()
+
+    def _submit(self, fn, *args):
+        self._pending.append(self._pool.submit(fn, *args))
+
+    def _post_json(self, payload):
+        """Posts a JSON-only webhook message, encoded by fast_json rather than requests' json=."""
+        return self.session.post(self.webhook_url, data=fast_json.dumps(payload), headers=_JSON_HEADERS, timeout=10)
 
     def get_now_pt(self, format='%Y-%m-%d %H:%M:%S'):
         """Helper to get current time in Pacific Time"""
@@ -22,16 +92,17 @@ class DiscordNotifier:
             return
 
         active_signals = 0
+        alerts = []
 
-        # Send individual alerts for actionable signals
+        # Queue individual alerts for actionable signals (sent concurrently in the background)
         for ticker, res in results.items():
             # 1. Handle Macro Report
             if ticker == 'MACRO':
-                self.send_macro_report(res)
+                self._submit(self.send_macro_report, res)
                 continue
 
             if res.get('type') == 'ALERT':
-                 self.send_alert(res)
+                 alerts.append(res)
                  active_signals += 1
                  continue
 
@@ -39,7 +110,21 @@ class DiscordNotifier:
                 continue 
             
             active_signals += 1
-            self._send_single_alert(ticker, res)
+            # Signal embeds carry a chart upload (multipart), so each is its own post
+            self._submit(self._send_single_alert, ticker, res)
+
+        # Watchdog alerts are text-only: pack them into as few messages as Discord allows
+        batch, batch_chars = [], 0
+        timestamp = self.get_now_pt()
+        for alert in alerts:
+            chars = _embed_chars(self._alert_embed(alert, timestamp))
+            if batch and (len(batch) == _MAX_EMBEDS or batch_chars + chars > _MAX_EMBED_CHARS):
+                self._submit(self._send_alerts, batch)
+                batch, batch_chars = [], 0
+            batch.append(alert)
+            batch_chars += chars
+        if batch:
+            self._submit(self._send_alerts, batch)
 
         if active_signals == 0:
             print("No active signals today.")
@@ -70,14 +155,10 @@ class DiscordNotifier:
             "footer": {"text": f"Macro Sentinel • {self.get_now_pt()}"}
         }
 
-        payload = {
-            "username": "Macro Sentinel 🦅",
-            "avatar_url": self.avatar_url,
-            "embeds": [embed]
-        }
+        payload = {**self._envelopes['macro'], "embeds": [embed]}
 
         try:
-            requests.post(self.webhook_url, json=payload)
+            self._post_json(payload)
             print(f"  -> Macro report sent.")
         except Exception as e:
             print(f"Failed to send macro report: {e}")
@@ -88,10 +169,13 @@ class DiscordNotifier:
         alert_data: {ticker, color, msg, price, change, ...}
         """
         if not self.webhook_url: return
+        self._send_alerts([alert_data])
+
+    def _alert_embed(self, alert_data, timestamp=None):
+        if timestamp is None:
+            timestamp = self.get_now_pt()
         
-        timestamp = self.get_now_pt()
-        
-        embed = {
+        return {
             "title": f"⚠️ {alert_data['ticker']} Anomaly Detected",
             "description": alert_data['msg'],
             "color": alert_data.get('color', 0xffa500),
@@ -101,27 +185,24 @@ class DiscordNotifier:
             ],
             "footer": {"text": f"Stock Sentinel Watchdog • {timestamp} PT"}
         }
-        
+
+    def _send_alerts(self, alerts):
+        """Posts several watchdog alerts as the embeds of one message."""
+        tickers = ", ".join(a['ticker'] for a in alerts)
+        timestamp = self.get_now_pt() # One footer time for the whole message
         payload = {
-            "username": "Sentinel Watchdog 🐕",
-            "avatar_url": self.avatar_url,
-            "embeds": [embed]
+            **self._envelopes['watchdog'],
+            "embeds": [self._alert_embed(a, timestamp) for a in alerts]
         }
-        
-        if self.user_id:
-            payload["content"] = f"<@{self.user_id}>"
 
         try:
-            requests.post(self.webhook_url, json=payload)
-            print(f"  -> Watchdog alert sent for {alert_data['ticker']}.")
+            self._post_json(payload)
+            print(f"  -> Watchdog alert sent for {tickers}.")
         except Exception as e:
-            print(f"Failed to send alert for {alert_data['ticker']}: {e}")
+            print(f"Failed to send alert for {tickers}: {e}")
     
     def _send_single_alert(self, ticker, res):
-        icon_map = {
-            "success": "🟢", "danger": "🔴", "warning": "🟠", "info": "⚪"
-        }
-        icon = icon_map.get(res['severity'], "⚪")
+        icon = self._icon_map.get(res['severity'], "⚪")
         
         # Current time for footer
         timestamp = self.get_now_pt()
@@ -129,7 +210,7 @@ class DiscordNotifier:
         
         if res.get('ai_model'):
             # Clean up model name (e.g. "openai/gpt-4o" -> "gpt-4o") for cleaner display
-            model_name = res['ai_model'].split('/')[-1]
+            model_name = res['ai_model'].rpartition('/')[2]
             footer_text += f" • AI: {model_name}"
 
         # Description construction
@@ -171,27 +252,21 @@ class DiscordNotifier:
                 'file': (f"{ticker}_chart.png", res['chart'], 'image/png')
             }
         
-        payload = {
-            "username": "Stock Sentinel 🤖",
-            "avatar_url": self.avatar_url,
-            "embeds": [embed]
-        }
-        
-        # Add @mention if user_id is provided
-        if self.user_id:
-            payload["content"] = f"<@{self.user_id}>"
+        # Envelope carries the @mention if user_id is provided
+        payload = {**self._envelopes['signal'], "embeds": [embed]}
         
         try:
             # When sending files, payload must be sent as 'payload_json' in multipart/form-data
             # or strictly as json if no files.
             if files:
-                requests.post(
+                self.session.post(
                     self.webhook_url, 
                     files=files,
-                    data={'payload_json': import_json.dumps(payload)}
+                    data={'payload_json': fast_json.dumps(payload).decode()},
+                    timeout=10
                 )
             else:
-                requests.post(self.webhook_url, json=payload)
+                self._post_json(payload)
                 
             print(f"  -> Discord notification sent for {ticker}.")
         except Exception as e:
@@ -211,26 +286,13 @@ class DiscordNotifier:
             "footer": {"text": f"Stock Sentinel AI • {self.get_now_pt('%Y-%m-%d')} PT"}
         }
         
-        payload = {
-            "username": "Sentinel Strategist 🔮",
-            "avatar_url": self.avatar_url,
-            "embeds": [embed]
-        }
+        payload = {**self._envelopes['strategist'], "embeds": [embed]}
         
         try:
-            requests.post(self.webhook_url, json=payload)
+            self._post_json(payload)
             print("  -> AI Recommendations sent to Discord.")
         except Exception as e:
             print(f"Failed to send recommendations: {e}")
 
     def _get_color(self, severity):
-        colors = {
-            "success": 0x2ecc71, # Green
-            "danger": 0xe74c3c,  # Red
-            "warning": 0xf1c40f, # Yellow
-            "info": 0x3498db     # Blue
-        }
-        return colors.get(severity, 0x3498db)
-
-# Helper to avoid global import if possible, or just standard import
-import json as import_json
\ No newline at end of file
+        return self._color_map.get(severity, 0x3498db)
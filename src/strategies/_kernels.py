@@ -0,0 +1,76 @@
+"""
+Numeric indicator kernels over float64 arrays.
+JIT-compiled with numba when it is installed. Strategies check HAVE_NUMBA and keep
+their pandas implementation otherwise, since the plain-Python loops would be slower.
+"""
+import numpy as np
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit (bare or with options)."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda fn: fn
+
+@njit(cache=True, error_model='numpy')
+def engineer_indicators(close, high, low, ema_alpha, rsi_alpha, atr_alpha):
+    """
+    EMA, Wilder RSI and Wilder ATR in one pass over the bars.
+    Same recursions as pandas .ewm(adjust=False) on NaN-free input (EMA alpha 2/(n+1),
+    Wilder alpha 1/n); numpy error semantics so a zero average loss gives RSI 100.
+    """
+    n = close.shape[0]
+    ema = np.empty(n)
+    rsi = np.empty(n)
+    atr = np.empty(n)
+    if n == 0:
+        return ema, rsi, atr
+
+    ema[0] = close[0]
+    avg_gain = 0.0
+    avg_loss = 0.0
+    rsi[0] = np.nan # No move yet (0/0), as in the pandas path
+    atr[0] = high[0] - low[0]
+    for i in range(1, n):
+        c = close[i]
+        prev = close[i - 1]
+        ema[i] = ema_alpha * c + (1.0 - ema_alpha) * ema[i - 1]
+
+        d = c - prev
+        gain = d if d > 0 else 0.0
+        loss = -d if d < 0 else 0.0
+        avg_gain = rsi_alpha * gain + (1.0 - rsi_alpha) * avg_gain
+        avg_loss = rsi_alpha * loss + (1.0 - rsi_alpha) * avg_loss
+        rsi[i] = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+        tr = max(high[i] - low[i], max(abs(high[i] - prev), abs(low[i] - prev)))
+        atr[i] = atr_alpha * tr + (1.0 - atr_alpha) * atr[i - 1]
+    return ema, rsi, atr
+
+# Eager signature: compiled (or loaded from the on-disk cache) at import, so a short
+# DAILY run does not pay type inference on its first ticker. Takes a contiguous float64 array.
+@njit('f8(f8[::1], i8)', cache=True, error_model='numpy')
+def wilder_rsi_last(close, period):
+    """
+    Wilder RSI of the last bar only, without keeping the per-bar series.
+    Same recursion as pandas .ewm(alpha=1/period, adjust=False) on the gains/losses
+    (the first bar counts as a zero move). 100 with no losses, 50 when every move is zero.
+    """
+    alpha = 1.0 / period
+    avg_gain = 0.0
+    avg_loss = 0.0
+    for i in range(1, close.shape[0]):
+        d = close[i] - close[i - 1]
+        gain = d if d > 0 else 0.0
+        loss = -d if d < 0 else 0.0
+        avg_gain = alpha * gain + (1.0 - alpha) * avg_gain
+        avg_loss = alpha * loss + (1.0 - alpha) * avg_loss
+    # Edge cases without dividing by zero
+    if avg_loss == 0.0:
+        return 50.0 if avg_gain == 0.0 else 100.0
+    return 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
@@ -1,6 +1,13 @@
 import pandas as pd
 import numpy as np
 from .base import BaseStrategy
+from . import _kernels
+
+try:
+    import talib
+    _HAS_TALIB = True
+except ImportError:
+    _HAS_TALIB = False
 
 class EngineerStrategy(BaseStrategy):
     def __init__(self, ema_len=20, rsi_len=14, atr_len=14, atr_mult=3.0):
@@ -9,13 +16,18 @@ class EngineerStrategy(BaseStrategy):
         self.atr_len = atr_len
         self.atr_mult = atr_mult
 
-    def analyze(self, df):
+    def _indicators(self, df):
         """
-        Analyze the given DataFrame and return trading signals.
+        Returns the (EMA, RSI, ATR) series for df.
+        All three are causal (adjust=False recursions), so row i only depends on rows <= i.
         """
-        # 1. Calculate Indicators
+        if _kernels.HAVE_NUMBA:
+            return self._indicators_jit(df)
+        if _HAS_TALIB:
+            return self._indicators_talib(df)
+
         # EMA
-        df['EMA'] = df['close'].ewm(span=self.ema_len, adjust=False).mean()
+        ema = df['close'].ewm(span=self.ema_len, adjust=False).mean()
 
         # RSI
         delta = df['close'].diff()
@@ -25,25 +37,87 @@ class EngineerStrategy(BaseStrategy):
         avg_gain = gain.ewm(alpha=1/self.rsi_len, adjust=False).mean()
         avg_loss = loss.ewm(alpha=1/self.rsi_len, adjust=False).mean()
         rs = avg_gain / avg_loss
-        df['RSI'] = 100 - (100 / (1 + rs))
+        rsi = 100 - (100 / (1 + rs))
 
         # ATR
-        high_low = df['high'] - df['low']
-        high_close = (df['high'] - df['close'].shift()).abs()
-        low_close = (df['low'] - df['close'].shift()).abs()
-        tr = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
+        high = df['high'].to_numpy(dtype=np.float64)
+        low = df['low'].to_numpy(dtype=np.float64)
+        prev_close = np.empty_like(high)
+        prev_close[:1] = np.nan
+        prev_close[1:] = df['close'].to_numpy(dtype=np.float64)[:-1]
+        # fmax skips NaN like DataFrame.max(axis=1), so the first bar's TR is just high - low
+        tr = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
         # Wilder's Smoothing for ATR
-        df['ATR'] = tr.ewm(alpha=1/self.atr_len, adjust=False).mean()
-        
-        # 2. Get current and last week data
-        curr = df.iloc[-1]
-        prev = df.iloc[-2]
-        
-        # 3. Extract needed values
-        price = curr['close']
-        ema = curr['EMA']
-        rsi = curr['RSI']
-        atr = curr['ATR']
+        atr = pd.Series(tr, index=df.index).ewm(alpha=1/self.atr_len, adjust=False).mean()
+
+        return ema, rsi, atr
+
+    def _indicators_jit(self, df):
+        """_indicators() via the fused numba kernel: one pass, no intermediate Series."""
+        ema, rsi, atr = _kernels.engineer_indicators(
+            df['close'].to_numpy(dtype=np.float64),
+            df['high'].to_numpy(dtype=np.float64),
+            df['low'].to_numpy(dtype=np.float64),
+            2.0 / (self.ema_len + 1), 1.0 / self.rsi_len, 1.0 / self.atr_len,
+        )
+        idx = df.index
+        return pd.Series(ema, index=idx), pd.Series(rsi, index=idx), pd.Series(atr, index=idx)
+
+    def _indicators_talib(self, df):
+        """
+        _indicators() via TA-Lib's C routines. TA-Lib seeds each recursion with an SMA
+        (leading bars are NaN), so early values differ slightly from the pandas path
+        and converge to it after a few dozen bars.
+        """
+        close = df['close'].to_numpy(dtype=np.float64)
+        high = df['high'].to_numpy(dtype=np.float64)
+        low = df['low'].to_numpy(dtype=np.float64)
+
+        ema = talib.EMA(close, timeperiod=self.ema_len)
+        rsi = talib.RSI(close, timeperiod=self.rsi_len)
+        atr = talib.ATR(high, low, close, timeperiod=self.atr_len)
+
+        idx = df.index
+        return pd.Series(ema, index=idx), pd.Series(rsi, index=idx), pd.Series(atr, index=idx)
+
+    def analyze(self, df, attach_indicators=False):
+        """
+        Analyze the given DataFrame and return trading signals.
+        attach_indicators: True also writes the EMA/RSI/ATR columns into df (for charting);
+        'signal' writes them only when the signal is not HOLD (the ones that get a chart).
+        """
+        # 1. Calculate Indicators
+        # Only the last two bars are read. The adjust=False recursions forget their seed
+        # geometrically (Wilder 1/14: ~3e-7 of it is left after 200 bars), so a long
+        # tail gives the full-history values to within ~1e-6; older rows get NaN.
+        window = max(self.ema_len, self.rsi_len, self.atr_len) * 10 + 2
+        tail = df.iloc[-window:]
+
+        # 2-4. Indicators and signal
+        analysis, ema, rsi, atr = self._evaluate(tail)
+        if attach_indicators is True or (attach_indicators == 'signal' and analysis['signal'] != "HOLD"):
+            df['EMA'], df['RSI'], df['ATR'] = (pd.Series(a, index=tail.index) for a in (ema, rsi, atr))
+
+        return analysis
+
+    def _evaluate(self, bars):
+        """
+        Signal for the last bar of bars (close/high/low columns).
+        Returns (analysis, ema, rsi, atr) with the indicator columns as arrays.
+        """
+        ema_s, rsi_s, atr_s = self._indicators(bars)
+
+        # Current and last week values, read straight from the column arrays
+        close_arr = bars['close'].to_numpy()
+        ema_arr = ema_s.to_numpy()
+        rsi_arr = rsi_s.to_numpy()
+        atr_arr = atr_s.to_numpy()
+        price = close_arr[-1]
+        ema = ema_arr[-1]
+        rsi = rsi_arr[-1]
+        atr = atr_arr[-1]
+        prev_close = close_arr[-2]
+        prev_ema = ema_arr[-2]
         
         # Define stop loss level: Use EMA minus 1*ATR as trend defense line
         # This is more forgiving than just EMA alone to avoid whipsaws
@@ -69,13 +143,13 @@ class EngineerStrategy(BaseStrategy):
             severity = "warning"
         
         # Logic C: Buy (Uptrend + (RSI pullback OR Fresh Breakout))
-        elif (price > ema) and (curr['RSI'] <= 55 or (prev['close'] < prev['EMA'])):
+        elif (price > ema) and (rsi <= 55 or (prev_close < prev_ema)):
             signal = "BUY"
             reason = "Trend confirmed + (RSI pullback OR Fresh Breakout)"
             severity = "success"
             
         # Logic D: Take Profit (Overbought)
-        elif curr['RSI'] > 75:
+        elif rsi > 75:
             signal = "PROFIT"
             reason = "RSI Overbought (>75). Consider taking partial profits."
             severity = "warning"
@@ -88,4 +162,42 @@ class EngineerStrategy(BaseStrategy):
             "signal": signal,
             "reason": reason,
             "severity": severity
-        }
\ No newline at end of file
+        }, ema_arr, rsi_arr, atr_arr
+
+    def analyze_vectorized(self, df):
+        """
+        Point-in-time analyze() for every row of df in one pass.
+        Row i equals analyze(df.iloc[:i+1]) because the indicators are causal.
+        Returns a DataFrame (same index) with price, ema, rsi, stop_loss, signal, reason, severity.
+        """
+        ema, rsi, atr = self._indicators(df)
+        price = df['close']
+        hard_stop = ema - (atr * 1.0)
+
+        # Same precedence as the if/elif chain in analyze()
+        sell = (price < hard_stop).to_numpy()
+        warn = (price < ema).to_numpy()
+        fresh_breakout = price.shift() < ema.shift() # last week closed below its EMA
+        buy = ((price > ema) & ((rsi <= 55) | fresh_breakout)).to_numpy()
+        profit = (rsi > 75).to_numpy()
+        conditions = [sell, warn, buy, profit]
+
+        signal = np.select(conditions, ["SELL", "HOLD", "BUY", "PROFIT"], default="HOLD")
+        severity = np.select(conditions, ["danger", "warning", "success", "warning"], default="info")
+        reason = np.select(conditions, [
+            "",
+            "Breached EMA but holding above ATR defense line. Watch until Friday close.",
+            "Trend confirmed + (RSI pullback OR Fresh Breakout)",
+            "RSI Overbought (>75). Consider taking partial profits.",
+        ], default="Price within normal fluctuation range").astype(object)
+        reason[sell] = [f"Breached ATR defense line (${s:.2f}) - Trend Reversal" for s in hard_stop.to_numpy()[sell]]
+
+        return pd.DataFrame({
+            "price": price,
+            "ema": ema,
+            "rsi": rsi,
+            "stop_loss": hard_stop,
+            "signal": signal,
+            "reason": reason,
+            "severity": severity,
+        }, index=df.index)
@@ -1,7 +1,64 @@
+import os
+import time
 import yfinance as yf
 import pandas as pd
-import numpy as np
 from datetime import timedelta
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+
+# Daily history pulled for the event windows; reused for a day across runs
+_HIST_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "stock-sentinel", "hist")
+_HIST_MAX_AGE = 86400
+
+@lru_cache(maxsize=512)
+def _get_ticker(symbol):
+    """One yf.Ticker per symbol for the whole process."""
+    return yf.Ticker(symbol)
+
+@lru_cache(maxsize=512)
+def _get_earnings_frame(symbol):
+    """earnings_dates with a tz-naive index, or None if Yahoo has none. Fetch errors propagate (and are not cached)."""
+    earnings = _get_ticker(symbol).earnings_dates
+    if earnings is None or earnings.empty:
+        return None
+
+    # Clean up index: remove timezone if present for comparison
+    if earnings.index.tz is not None:
+        earnings = earnings.copy()
+        earnings.index = earnings.index.tz_localize(None)
+    return earnings
+
+def _history_path(symbol, start):
+    return os.path.join(_HIST_CACHE_DIR, f"{symbol}_{start}.pkl")
+
+def _read_cached_history(symbol, start):
+    """The cached history for (symbol, start) if it is less than a day old, else None."""
+    path = _history_path(symbol, start)
+    try:
+        if time.time() - os.path.getmtime(path) < _HIST_MAX_AGE:
+            return pd.read_pickle(path)
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, EOFError) as e:
+        print(f"⚠️ History cache read failed for {symbol}: {e}")
+    return None
+
+def _write_cached_history(symbol, start, hist):
+    if hist.empty:
+        return
+    try:
+        os.makedirs(_HIST_CACHE_DIR, exist_ok=True)
+        hist.to_pickle(_history_path(symbol, start))
+    except OSError as e:
+        print(f"⚠️ History cache write failed for {symbol}: {e}")
+
+def _get_history(symbol, start):
+    """Ticker.history(start=start) behind a pickle on disk, refetched once it is a day old."""
+    hist = _read_cached_history(symbol, start)
+    if hist is None:
+        hist = _get_ticker(symbol).history(start=start)
+        _write_cached_history(symbol, start, hist)
+    return hist
 
 class EventBacktester:
     def __init__(self):
@@ -15,123 +72,156 @@ class EventBacktester:
             dict: Statistics about post-earnings gaps and drifts.
         """
         try:
-            # 1. Fetch Earnings Dates
-            t = yf.Ticker(ticker)
-            
-            # yfinance earnings_dates often returns a dataframe with index as Timestamp
+            past_earnings, error = self._past_earnings(ticker, lookback_quarters)
+            if error:
+                return error
+
+            # 2. Fetch Price History covering these events
+            hist = _get_history(ticker, self._history_start(past_earnings))
+            return self._event_stats(past_earnings, hist)
+
+        except Exception as e:
+            return self.empty_result(f"Analysis error: {str(e)}")
+
+    def analyze_batch(self, tickers, lookback_quarters=8):
+        """
+        analyze_earnings_behavior() for several tickers. Earnings dates are fetched
+        concurrently and every price history not cached yet comes from one threaded
+        yf.download. Returns {ticker: stats}.
+        """
+        tickers = list(dict.fromkeys(tickers))
+        if not tickers:
+            return {}
+
+        with ThreadPoolExecutor(max_workers=min(len(tickers), 8)) as ex:
+            pasts = dict(zip(tickers, ex.map(lambda t: self._past_earnings(t, lookback_quarters), tickers)))
+
+        stats = {t: error for t, (_, error) in pasts.items() if error}
+        pending = [t for t in tickers if t not in stats]
+        starts = {t: self._history_start(pasts[t][0]) for t in pending}
+        hists = {t: _read_cached_history(t, starts[t]) for t in pending}
+
+        missing = [t for t in pending if hists[t] is None]
+        if missing:
+            print(f"  -> Downloading price history for {missing}...")
             try:
-                earnings = t.earnings_dates
-                if earnings is None or earnings.empty:
-                    return self._empty_result(f"No earnings dates found for {ticker}")
+                # auto_adjust matches Ticker.history's default, so the figures are unchanged
+                panel = yf.download(tickers=missing, start=min(starts[t] for t in missing), group_by='ticker',
+                                    threads=True, auto_adjust=True, progress=False)
             except Exception as e:
-                # Sometimes yf structure changes or fails
-                return self._empty_result(f"Earnings fetch failed: {str(e)}")
+                panel = None
+                for t in missing:
+                    stats[t] = self.empty_result(f"Analysis error: {str(e)}")
 
-            # Filter for past dates only
-            now = pd.Timestamp.now().tz_localize(None)
-            
-            # Clean up index: remove timezone if present for comparison
-            if earnings.index.tz is not None:
-                earnings.index = earnings.index.tz_localize(None)
+            if panel is not None:
+                for t in missing:
+                    try:
+                        hist = panel[t] if isinstance(panel.columns, pd.MultiIndex) else panel
+                    except KeyError: # Yahoo returned nothing for this symbol
+                        hists[t] = pd.DataFrame()
+                        continue
+                    hist = hist[hist.index >= starts[t]].dropna(subset=['Close'])
+                    _write_cached_history(t, starts[t], hist)
+                    hists[t] = hist
 
-            past_earnings = earnings[earnings.index < now].sort_index(ascending=False).head(lookback_quarters)
-            
-            if past_earnings.empty:
-                return self._empty_result("No past earnings found")
+        for t in pending:
+            if t not in stats:
+                try:
+                    stats[t] = self._event_stats(pasts[t][0], hists[t])
+                except Exception as e:
+                    stats[t] = self.empty_result(f"Analysis error: {str(e)}")
 
-            # 2. Fetch Price History covering these events
-            # We need enough buffer. 8 quarters ~ 2 years. Let's get 3 years.
-            start_date = past_earnings.index.min() - timedelta(days=30)
-            hist = t.history(start=start_date)
-            
-            if hist.empty:
-                return self._empty_result("No price history found")
-
-            # Remove timezone from hist index for easier matching
-            if hist.index.tz is not None:
-                hist.index = hist.index.tz_localize(None)
-
-            results = []
-
-            for date in past_earnings.index:
-                # Find the closest trading day ON or AFTER the earnings date
-                # If earnings are After Market Close (AMC), the reaction is next day.
-                # If Before Market Open (BMO), reaction is same day.
-                # Since we don't always know AMC/BMO perfectly, we look at the change 
-                # from "Day Before" to "Day After".
-                
-                # Locating the event index in price history
-                # We search for the date in the index.
-                
-                # Simple logic: Reaction Day (T0) is the first trading day >= Earnings Date
-                # BUT, if earnings date is a trading day, and it was AMC, the gap is next day.
-                # Safe bet: Measure Close(T-1) vs Open(T+1) or Close(T+1).
-                
-                # Let's find T (Earnings Date)
-                idx_loc = hist.index.get_indexer([date], method='nearest')[0]
-                if idx_loc == -1: continue
-                
-                # Ensure we have enough data before and after
-                if idx_loc < 1 or idx_loc >= len(hist) - 5:
-                    continue
-                
-                # Define T-1 (Pre-Event) and T+1 (Post-Event Reaction)
-                # Note: yfinance earnings dates are often the reported date.
-                # We analyze the immediate impact: T-1 Close vs T+1 Close (2 day window captures the event safely)
-                # Or T-1 Close vs T0 Close.
-                
-                # Let's use T-1 Close as baseline.
-                t_minus_1 = hist.iloc[idx_loc - 1]
-                t_0 = hist.iloc[idx_loc]       # Event Day
-                t_plus_1 = hist.iloc[idx_loc + 1] # Next Day
-                t_plus_5 = hist.iloc[min(idx_loc + 5, len(hist)-1)] # 1 Week Later
-
-                # Metric 1: Immediate Reaction (Gap + Day Move)
-                # (Close of T+1 - Close of T-1) / Close of T-1
-                # We use T+1 to be safe about AMC/BMO timing differences.
-                pct_move_immediate = (t_plus_1['Close'] - t_minus_1['Close']) / t_minus_1['Close'] * 100
-                
-                # Metric 2: 1-Week Drift (Trend Continuation)
-                # (Close of T+5 - Close of T+1) / Close of T+1
-                pct_drift_week = (t_plus_5['Close'] - t_plus_1['Close']) / t_plus_1['Close'] * 100
-
-                results.append({
-                    'date': date.strftime('%Y-%m-%d'),
-                    'immediate_move': pct_move_immediate,
-                    'drift_week': pct_drift_week
-                })
-
-            # 3. Compile Statistics
-            if not results:
-                return self._empty_result("Insufficient data points for statistics")
-
-            moves = [r['immediate_move'] for r in results]
-            drifts = [r['drift_week'] for r in results]
-            
-            avg_move = np.mean(moves)
-            win_rate = sum(1 for x in moves if x > 0) / len(moves) * 100 # "Win" = Positive reaction
-            
-            # Smart Money Logic:
-            # If stock usually pops (Move > 0) but then fades (Drift < 0), that's a "Fade the Rip" signal.
-            # If stock drops (Move < 0) but recovers (Drift > 0), that's "Buy the Dip".
-            
-            fade_probability = sum(1 for r in results if r['immediate_move'] > 0 and r['drift_week'] < 0) / len(results) * 100
-            
-            summary = {
-                "events_analyzed": len(results),
-                "avg_reaction": avg_move,
-                "win_rate": win_rate, # % of times it went UP after earnings
-                "fade_rip_prob": fade_probability, # % of times it popped then dropped
-                "details": results, # List of dicts
-                "message": self._generate_insight(avg_move, win_rate, fade_probability)
-            }
-            
-            return summary
+        return {t: stats[t] for t in tickers}
 
+    def _past_earnings(self, ticker, lookback_quarters):
+        """Returns (the last N past earnings rows, None), or (None, an empty result explaining why)."""
+        # 1. Fetch Earnings Dates
+        # yfinance earnings_dates often returns a dataframe with index as Timestamp
+        try:
+            earnings = _get_earnings_frame(ticker)
+            if earnings is None:
+                return None, self.empty_result(f"No earnings dates found for {ticker}")
         except Exception as e:
-            return self._empty_result(f"Analysis error: {str(e)}")
+            # Sometimes yf structure changes or fails
+            return None, self.empty_result(f"Earnings fetch failed: {str(e)}")
+
+        # Filter for past dates only
+        now = pd.Timestamp.now().tz_localize(None)
+
+        past_earnings = earnings[earnings.index < now].sort_index(ascending=False).head(lookback_quarters)
+        
+        if past_earnings.empty:
+            return None, self.empty_result("No past earnings found")
+        return past_earnings, None
+
+    @staticmethod
+    def _history_start(past_earnings):
+        # We need enough buffer before the oldest event (8 quarters ~ 2 years of history)
+        return (past_earnings.index.min() - timedelta(days=30)).strftime('%Y-%m-%d')
+
+    def _event_stats(self, past_earnings, hist):
+        """Reaction statistics of past_earnings measured on the daily history hist."""
+        if hist.empty:
+            return self.empty_result("No price history found")
+
+        # Remove timezone from hist index for easier matching
+        if hist.index.tz is not None:
+            hist.index = hist.index.tz_localize(None)
+
+        # Simple logic: Reaction Day (T0) is the trading day nearest each earnings date.
+        # If earnings are After Market Close (AMC), the reaction is next day; if Before
+        # Market Open (BMO), it is the same day. Since we don't always know AMC/BMO,
+        # every event is measured from "Day Before" (T-1) to "Day After" (T+1).
+        closes = hist['Close'].to_numpy()
+        idx = hist.index.get_indexer(past_earnings.index, method='nearest')
+
+        # Ensure we have enough data before and after (T-1 through T+5)
+        valid = (idx >= 1) & (idx < len(closes) - 5)
+        if not valid.any():
+            return self.empty_result("Insufficient data points for statistics")
+        idx = idx[valid]
+
+        c_minus_1 = closes[idx - 1]
+        c_plus_1 = closes[idx + 1]  # Next Day
+        c_plus_5 = closes[idx + 5]  # 1 Week Later
+
+        # Metric 1: Immediate Reaction (Gap + Day Move)
+        # (Close of T+1 - Close of T-1) / Close of T-1
+        # We use T+1 to be safe about AMC/BMO timing differences.
+        moves = (c_plus_1 - c_minus_1) / c_minus_1 * 100
+
+        # Metric 2: 1-Week Drift (Trend Continuation)
+        # (Close of T+5 - Close of T+1) / Close of T+1
+        drifts = (c_plus_5 - c_plus_1) / c_plus_1 * 100
+
+        results = [
+            {'date': d, 'immediate_move': m, 'drift_week': w}
+            for d, m, w in zip(past_earnings.index[valid].strftime('%Y-%m-%d'), moves.tolist(), drifts.tolist())
+        ]
+
+        # 3. Compile Statistics
+        avg_move = moves.mean()
+        win_rate = (moves > 0).mean() * 100 # "Win" = Positive reaction
+        
+        # Smart Money Logic:
+        # If stock usually pops (Move > 0) but then fades (Drift < 0), that's a "Fade the Rip" signal.
+        # If stock drops (Move < 0) but recovers (Drift > 0), that's "Buy the Dip".
+        
+        fade_probability = ((moves > 0) & (drifts < 0)).mean() * 100
+        
+        summary = {
+            "events_analyzed": len(results),
+            "avg_reaction": avg_move,
+            "win_rate": win_rate, # % of times it went UP after earnings
+            "fade_rip_prob": fade_probability, # % of times it popped then dropped
+            "details": results, # List of dicts
+            "message": self._generate_insight(avg_move, win_rate, fade_probability)
+        }
+        
+        return summary
 
-    def _empty_result(self, msg):
+    def empty_result(self, msg):
+        """The stats dict with no events, e.g. for a ticker that is skipped or has no data."""
         return {
             "events_analyzed": 0,
             "avg_reaction": 0.0,
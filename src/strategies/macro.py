@@ -1,12 +1,63 @@
+import os
 import yfinance as yf
 import pandas as pd
+import numpy as np
 from enum import Enum
+from functools import lru_cache
+from datetime import datetime, timezone
+
+# Macro bars on disk, so a re-run within the same UTC hour skips Yahoo entirely
+_MACRO_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "stock-sentinel", "macro")
+
+def _macro_path(tickers):
+    return os.path.join(_MACRO_CACHE_DIR, f"{'_'.join(tickers)}.pkl")
+
+def _read_cached_macro(hour_key, tickers):
+    """The cached frame for tickers if it was written in the hour hour_key names, else None."""
+    path = _macro_path(tickers)
+    try:
+        written = datetime.fromtimestamp(os.path.getmtime(path), timezone.utc)
+        if written.strftime('%Y-%m-%d-%H') == hour_key:
+            return pd.read_pickle(path)
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, EOFError) as e:
+        print(f"⚠️ Macro cache read failed: {e}")
+    return None
+
+def _write_cached_macro(tickers, data):
+    if data.empty:
+        return
+    try:
+        os.makedirs(_MACRO_CACHE_DIR, exist_ok=True)
+        data.to_pickle(_macro_path(tickers))
+    except OSError as e:
+        print(f"⚠️ Macro cache write failed: {e}")
+
+@lru_cache(maxsize=4)
+def _fetch_macro(hour_key, tickers):
+    """
+    Last 10 days of bars for tickers, downloaded once per UTC hour (hour_key) and shared
+    by every analyze() in that hour, in this process and (via a pickle on disk) later ones.
+    The frame is cached as-is, so callers must not mutate it.
+    """
+    data = _read_cached_macro(hour_key, tickers)
+    if data is None:
+        data = yf.download(list(tickers), period="10d", progress=False, threads=True)
+        _write_cached_macro(tickers, data)
+    return data
 
 class MarketRegime(Enum):
     RISK_ON = "RISK_ON"       # Favorable environment (Yields dropping/stable)
     NEUTRAL = "NEUTRAL"       # Mixed signals
     RISK_OFF = "RISK_OFF"     # Hostile environment (Yields spiking, Dollar strong)
 
+# Regime strings as returned in the result dict (MarketRegime stays the public names for them)
+_RISK_ON, _NEUTRAL, _RISK_OFF = MarketRegime.RISK_ON.value, MarketRegime.NEUTRAL.value, MarketRegime.RISK_OFF.value
+
+# Indexed by sign(score) + 1 in MacroSentinel.analyze_with()
+_REGIME_BY_SIGN = (_RISK_OFF, _NEUTRAL, _RISK_ON)
+
 class MacroSentinel:
     def __init__(self):
         # ^TNX: CBOE Interest Rate 10 Year T No (Yield)
@@ -20,17 +71,30 @@ class MacroSentinel:
         """
         try:
             # Fetch last 10 days of data to see short-term trend
-            data = yf.download(self.tickers, period="10d", progress=False, threads=False)
-            
+            hour_key = datetime.now(timezone.utc).strftime('%Y-%m-%d-%H')
+            data = _fetch_macro(hour_key, tuple(self.tickers))
+        except Exception as e:
+            return self._default_error_response(f"Exception: {str(e)}")
+        return self.analyze_with(data)
+
+    def analyze_with(self, data):
+        """
+        analyze() on an already downloaded yf.download() frame, e.g. one batched request for
+        the macro tickers plus others. Takes the default (Close -> Ticker) column layout or
+        group_by='ticker' (Ticker -> Close); needs at least 5 recent daily closes of each.
+        """
+        try:
             # yfinance returns a MultiIndex column structure if downloading multiple tickers.
-            # Structure: Close -> Ticker
+            # Structure: Close -> Ticker, or Ticker -> Close with group_by='ticker'
             # We need to handle single ticker vs multi ticker return structure safely, 
             # though usually with >1 ticker it's MultiIndex.
             
-            if 'Close' not in data:
+            if 'Close' in data:
+                closes = data['Close']
+            elif isinstance(data.columns, pd.MultiIndex) and 'Close' in data.columns.get_level_values(1):
+                closes = data.xs('Close', axis=1, level=1)
+            else:
                 return self._default_error_response("No Close data found")
-
-            closes = data['Close']
             
             # Handle if one of the tickers failed to download
             if '^TNX' not in closes.columns or 'DX-Y.NYB' not in closes.columns:
@@ -38,22 +102,25 @@ class MacroSentinel:
                 # For simplicity in this v1, we return Neutral if data is missing
                 return self._default_error_response("Missing macro data")
 
+            # Both columns as one float array; NaN gaps are dropped per column below
+            arr = closes[['^TNX', 'DX-Y.NYB']].to_numpy(dtype=np.float64)
+
             # 1. Analyze 10-Year Yield (^TNX)
-            tnx = closes['^TNX'].dropna()
+            tnx = arr[:, 0][~np.isnan(arr[:, 0])]
             if len(tnx) < 5: 
                 return self._default_error_response("Insufficient TNX data")
             
-            tnx_curr = tnx.iloc[-1]
-            tnx_prev_5d = tnx.iloc[-5]
+            tnx_curr = tnx[-1]
+            tnx_prev_5d = tnx[-5]
             tnx_change_pct = ((tnx_curr - tnx_prev_5d) / tnx_prev_5d) * 100
             
             # 2. Analyze Dollar Index (DXY)
-            dxy = closes['DX-Y.NYB'].dropna()
+            dxy = arr[:, 1][~np.isnan(arr[:, 1])]
             if len(dxy) < 5:
                 return self._default_error_response("Insufficient DXY data")
 
-            dxy_curr = dxy.iloc[-1]
-            dxy_prev_5d = dxy.iloc[-5]
+            dxy_curr = dxy[-1]
+            dxy_prev_5d = dxy[-5]
             dxy_change_pct = ((dxy_curr - dxy_prev_5d) / dxy_prev_5d) * 100
 
             # 3. Determine Regime
@@ -61,40 +128,39 @@ class MacroSentinel:
             # - Yield spiking > 3% in 5 days is DANGEROUS for tech.
             # - DXY spiking > 1% in 5 days is Headwind.
             
-            regime = MarketRegime.NEUTRAL
+            tnx_spike = tnx_change_pct > 3.0
+            tnx_cool = tnx_change_pct < -3.0
+            dxy_strong = dxy_change_pct > 1.0
+            dxy_weak = dxy_change_pct < -1.0
+
+            # Score the two signals instead of stepping the regime through if/elif:
+            # a yield spike (-2) outweighs a weak dollar (+1), so it stays RISK_OFF; a strong
+            # dollar (-1) drags RISK_ON to NEUTRAL and NEUTRAL to RISK_OFF.
+            # Sign of the score: < 0 RISK_OFF, 0 NEUTRAL, > 0 RISK_ON
+            # int(): the checks are np.bool_, and np.bool_ - np.bool_ raises TypeError
+            score = int(-2 * tnx_spike + tnx_cool - dxy_strong + dxy_weak)
+            regime = _REGIME_BY_SIGN[(score > 0) - (score < 0) + 1]
+
             reason = []
 
             # Check Yields (The "Killer" of Valuation)
-            if tnx_change_pct > 3.0:
-                regime = MarketRegime.RISK_OFF
+            if tnx_spike:
                 reason.append(f"⚠️ US 10Y Yield Spiking (+{tnx_change_pct:.2f}% in 5d)")
-            elif tnx_change_pct < -3.0:
+            elif tnx_cool:
                 # Dropping yields usually good for tech, unless it's recession fear. 
                 # For now, treat as Risk On / Support.
-                if regime != MarketRegime.RISK_OFF:
-                    regime = MarketRegime.RISK_ON
                 reason.append(f"✅ US 10Y Yield Cooling ({tnx_change_pct:.2f}% in 5d)")
             else:
                 reason.append(f"ℹ️ US 10Y Yield Stable ({tnx_change_pct:.2f}%)")
 
             # Check Dollar (The Liquidity Constrictor)
-            if dxy_change_pct > 1.0:
-                # If Yields are already bad, this confirms it. 
-                # If Yields are OK, this might drag it to Neutral/Risk Off.
-                if regime == MarketRegime.RISK_ON:
-                    regime = MarketRegime.NEUTRAL
-                elif regime == MarketRegime.NEUTRAL:
-                    regime = MarketRegime.RISK_OFF
-                
+            if dxy_strong:
                 reason.append(f"⚠️ DXY Strengthening (+{dxy_change_pct:.2f}%)")
-            
-            elif dxy_change_pct < -1.0:
+            elif dxy_weak:
                 reason.append(f"✅ DXY Weakening ({dxy_change_pct:.2f}%)")
-                if regime == MarketRegime.NEUTRAL:
-                    regime = MarketRegime.RISK_ON
 
             return {
-                "regime": regime.value,
+                "regime": regime,
                 "tnx_current": tnx_curr,
                 "dxy_current": dxy_curr,
                 "reason": " | ".join(reason),
@@ -106,7 +172,7 @@ class MacroSentinel:
 
     def _default_error_response(self, msg):
         return {
-            "regime": "NEUTRAL",
+            "regime": _NEUTRAL,
             "tnx_current": 0.0,
             "dxy_current": 0.0,
             "reason": f"Macro Data Error: {msg}",
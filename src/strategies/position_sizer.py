@@ -1,6 +1,12 @@
-import math
-
 class PositionSizer:
+    # Share of base risk taken per macro regime
+    # "Giant Jack" Philosophy: Bet big when conditions align, shrink when they don't.
+    _RISK_MODIFIER = {
+        "RISK_ON": 1.0,   # Full Size (e.g., 1% risk)
+        "NEUTRAL": 0.5,   # Half Size (e.g., 0.5% risk) - "Tiny Test"
+        "RISK_OFF": 0.25  # Quarter Size or cash (e.g., 0.25% risk)
+    }
+
     def __init__(self, account_size=10000.0, base_risk_pct=0.01):
         """
         account_size: Total portfolio value (cash + equity).
@@ -14,15 +20,8 @@ class PositionSizer:
         Calculates the recommended position size based on risk and macro environment.
         """
         # 1. Determine Risk Percentage based on Macro Regime
-        # "Giant Jack" Philosophy: Bet big when conditions align, shrink when they don't.
-        risk_modifier = {
-            "RISK_ON": 1.0,   # Full Size (e.g., 1% risk)
-            "NEUTRAL": 0.5,   # Half Size (e.g., 0.5% risk) - "Tiny Test"
-            "RISK_OFF": 0.25  # Quarter Size or cash (e.g., 0.25% risk)
-        }
-        
         # Default to conservative if regime unknown
-        modifier = risk_modifier.get(macro_regime, 0.5)
+        modifier = self._RISK_MODIFIER.get(macro_regime, 0.5)
         
         effective_risk_pct = self.base_risk_pct * modifier
         risk_amount = self.account_size * effective_risk_pct
@@ -45,15 +44,15 @@ class PositionSizer:
         max_allocation_amt = self.account_size * 0.25 
         max_shares_allocation = max_allocation_amt / price
         
-        final_shares = min(shares, max_shares_allocation)
-        final_shares = math.floor(final_shares) # Integer shares
+        # Integer shares; both bounds are non-negative, so truncating is the floor
+        final_shares = int(min(shares, max_shares_allocation))
         
         # 5. Position Stats
         position_value = final_shares * price
         actual_risk = final_shares * risk_per_share
         
         return {
-            "shares": int(final_shares),
+            "shares": final_shares,
             "position_value": position_value,
             "risk_amount": actual_risk,
             "risk_pct_of_account": (actual_risk / self.account_size) * 100,
@@ -1,63 +1,71 @@
 # import pandas_ta as ta
 import pandas as pd
 import numpy as np
+from . import _kernels
 
 class WatchdogStrategy:
-    def analyze(self, ticker, df):
+    # Thresholds
+    CRASH_THRESHOLD = -6.0
+    SPIKE_THRESHOLD = 6.0
+    VOLUME_THRESHOLD = 2.5
+    RSI_OVERSOLD = 30
+
+    def _rsi(self, close, period=14):
+        """Current Wilder RSI of close, or 50 when there has been no move at all."""
+        # Only the last value is needed, and the recursion forgets its seed geometrically
+        # ((13/14)^140 ~ 3e-5 is left), so a 10x tail stands in for the full history
+        close = close[-(period * 10 + 1):]
+        if _kernels.HAVE_NUMBA:
+            # The kernel's eager signature takes C-contiguous float64 only; a column view may be strided
+            return _kernels.wilder_rsi_last(np.ascontiguousarray(close, dtype=np.float64), period)
+
+        delta = pd.Series(close).diff()
+        gain = (delta.where(delta > 0, 0))
+        loss = (-delta.where(delta < 0, 0))
+        
+        # Use EWM with alpha=1/period (1/14) for standard Wilder's RSI
+        avg_gain = gain.ewm(alpha=1/period, adjust=False).mean()
+        avg_loss = loss.ewm(alpha=1/period, adjust=False).mean()
+        
+        rs = avg_gain / avg_loss
+        return 100 - (100 / (1 + rs.iloc[-1])) if not np.isnan(rs.iloc[-1]) else 50
+
+    def analyze(self, ticker, close, volume):
         """
         Analyze daily data for anomalies.
+        close / volume: float64 arrays of the daily bars, oldest first.
         Returns None if normal, or a dict with alert details if anomalous.
         """
-        if df is None or len(df) < 14:
+        if close is None or len(close) < 14:
             return None
             
-        curr = df.iloc[-1]
-        prev = df.iloc[-2]
-        
         # 1. Percent Change (Compared to Yesterday's Close)
-        pct_change = (curr['close'] - prev['close']) / prev['close'] * 100
+        pct_change = (close[-1] - close[-2]) / close[-2] * 100
         
         # 2. Relative Volume (RVOL)
         # Avg volume of past 5 days (excluding today)
-        avg_vol = df['volume'].iloc[-6:-1].mean()
-        vol_ratio = curr['volume'] / avg_vol if avg_vol > 0 else 0
+        avg_vol = volume[-6:-1].mean()
+        vol_ratio = volume[-1] / avg_vol if avg_vol > 0 else 0
         
         # 3. RSI Calculation (Wilder's Smoothing)
-        delta = df['close'].diff()
-        gain = (delta.where(delta > 0, 0))
-        loss = (-delta.where(delta < 0, 0))
-        
-        # Use EWM with alpha=1/14 for standard Wilder's RSI
-        avg_gain = gain.ewm(alpha=1/14, adjust=False).mean()
-        avg_loss = loss.ewm(alpha=1/14, adjust=False).mean()
-        
-        rs = avg_gain / avg_loss
-        daily_rsi = 100 - (100 / (1 + rs.iloc[-1])) if not np.isnan(rs.iloc[-1]) else 50
-
-        signals = []
-        
-        # Thresholds
-        CRASH_THRESHOLD = -6.0
-        SPIKE_THRESHOLD = 6.0
-        VOLUME_THRESHOLD = 2.5
-        RSI_OVERSOLD = 30
+        daily_rsi = self._rsi(close)
 
         signals = []
 
         # A. Flash Crash
-        if pct_change < CRASH_THRESHOLD:
+        if pct_change < self.CRASH_THRESHOLD:
             signals.append(f"📉 **Flash Crash Alert**: Dropped {pct_change:.2f}%")
             
         # B. Volume Spike
-        if vol_ratio > VOLUME_THRESHOLD:
+        if vol_ratio > self.VOLUME_THRESHOLD:
             signals.append(f"📢 **Volume Spike**: {vol_ratio:.1f}x average volume")
             
         # C. Breakout (Optional, but good context)
-        if pct_change > SPIKE_THRESHOLD:
+        if pct_change > self.SPIKE_THRESHOLD:
             signals.append(f"🚀 **Breakout**: Gained {pct_change:.2f}%")
 
         # D. Oversold
-        if daily_rsi < RSI_OVERSOLD:
+        if daily_rsi < self.RSI_OVERSOLD:
             signals.append(f"💎 **Oversold Zone**: RSI is {daily_rsi:.1f}")
 
         if signals:
@@ -66,7 +74,7 @@ class WatchdogStrategy:
                 'type': 'ALERT',
                 'color': 0xffa500, # Orange
                 'msg': "\n".join(signals),
-                'price': curr['close'],
+                'price': close[-1],
                 'change': pct_change
             }
             
@@ -0,0 +1,26 @@
+"""Ticker extraction from the model's screener answers."""
+import pytest
+
+pytest.importorskip("requests")
+
+from src.ai_analyst import _clean_ticker
+
+
+@pytest.mark.parametrize("raw, ticker", [
+    ("NVDA", "NVDA"),
+    ("Nvidia (NVDA)", "NVDA"),
+    ("NVDA (Nvidia)", "NVDA"),
+    ("$TSLA", "TSLA"),
+    ("Tesla $TSLA", "TSLA"),
+    ("BRK.B", "BRK.B"),
+    ("brk.b", "BRK.B"),
+    ("BF-B", "BF-B"),
+    ("NVDA - Nvidia", "NVDA"),
+])
+def test_clean_ticker(raw, ticker):
+    assert _clean_ticker(raw) == ticker
+
+
+@pytest.mark.parametrize("raw", ["Nvidia Corp", "NVIDIACORP", "", None, 42])
+def test_clean_ticker_rejects_non_symbols(raw):
+    assert _clean_ticker(raw) is None
@@ -0,0 +1,58 @@
+"""
+Parity of the optional accelerated indicator paths (numba, TA-Lib) with the pandas ones.
+Skipped unless the accelerator is installed: pip install -r requirements-optional.txt
+"""
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("pandas")
+import pandas as pd
+
+from src.strategies import _kernels, engineer
+from src.strategies.engineer import EngineerStrategy
+from src.strategies.watchdog import WatchdogStrategy
+
+
+def _bars(n=400, seed=7):
+    """Random-walk OHLC bars with a few flat stretches (zero moves)."""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    close[50:55] = close[49]
+    spread = np.abs(rng.normal(0, 0.01, n)) * close
+    idx = pd.date_range("2020-01-03", periods=n, freq="W-FRI")
+    return pd.DataFrame({"close": close, "high": close + spread, "low": close - spread}, index=idx)
+
+
+def _pandas_indicators(df, monkeypatch):
+    monkeypatch.setattr(_kernels, "HAVE_NUMBA", False)
+    monkeypatch.setattr(engineer, "_HAS_TALIB", False)
+    return EngineerStrategy()._indicators(df)
+
+
+def test_engineer_jit_matches_pandas(monkeypatch):
+    pytest.importorskip("numba")
+    df = _bars()
+    jit = EngineerStrategy()._indicators_jit(df)
+    expected = _pandas_indicators(df, monkeypatch)
+    for got, want in zip(jit, expected):
+        np.testing.assert_allclose(got.to_numpy(), want.to_numpy(), rtol=1e-10, equal_nan=True)
+
+
+def test_engineer_talib_converges_to_pandas(monkeypatch):
+    pytest.importorskip("talib")
+    df = _bars()
+    talib_out = EngineerStrategy()._indicators_talib(df)
+    expected = _pandas_indicators(df, monkeypatch)
+    # TA-Lib seeds each recursion with an SMA; compare once the seed has decayed
+    for got, want in zip(talib_out, expected):
+        np.testing.assert_allclose(got.to_numpy()[-100:], want.to_numpy()[-100:], rtol=1e-6)
+
+
+@pytest.mark.parametrize("flat", [False, True])
+def test_watchdog_rsi_jit_matches_pandas(monkeypatch, flat):
+    pytest.importorskip("numba")
+    close = np.full(30, 50.0) if flat else _bars(30)[["close", "high"]].to_numpy()[:, 0]
+    got = WatchdogStrategy()._rsi(close)
+    monkeypatch.setattr(_kernels, "HAVE_NUMBA", False)
+    want = WatchdogStrategy()._rsi(close)
+    assert got == pytest.approx(want, rel=1e-10)
@@ -0,0 +1,39 @@
+"""MacroSentinel regime scoring on float64 frames shaped like yf.download() output."""
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+pytest.importorskip("yfinance")
+
+from src.strategies.macro import MacroSentinel
+
+
+def _frame(tnx_move, dxy_move):
+    """10 daily closes per ticker; the last close moves by the given % from the 5th-to-last."""
+    tnx = np.full(10, 4.0)
+    dxy = np.full(10, 100.0)
+    tnx[-4:] *= 1 + tnx_move / 100
+    dxy[-4:] *= 1 + dxy_move / 100
+    columns = pd.MultiIndex.from_tuples([("Close", "^TNX"), ("Close", "DX-Y.NYB")])
+    return pd.DataFrame(np.column_stack([tnx, dxy]), columns=columns,
+                        index=pd.date_range("2024-01-01", periods=10, freq="B"))
+
+
+@pytest.mark.parametrize("tnx_move, dxy_move, regime", [
+    (-5.0, 0.0, "RISK_ON"),
+    (0.0, -2.0, "RISK_ON"),
+    (0.0, 0.0, "NEUTRAL"),
+    (-5.0, 2.0, "NEUTRAL"),
+    (5.0, 0.0, "RISK_OFF"),
+    (5.0, -2.0, "RISK_OFF"),
+    (0.0, 2.0, "RISK_OFF"),
+])
+def test_regime_from_float64_frame(tnx_move, dxy_move, regime):
+    result = MacroSentinel().analyze_with(_frame(tnx_move, dxy_move))
+    assert "Error" not in result["reason"]
+    assert result["regime"] == regime
+
+
+def test_regime_from_group_by_ticker_frame():
+    data = _frame(5.0, 0.0).swaplevel(axis=1)
+    assert MacroSentinel().analyze_with(data)["regime"] == "RISK_OFF"